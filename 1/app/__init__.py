@@ -1,10 +1,15 @@
 import os
-from flask import Flask, url_for
-from sqlalchemy import text, inspect
+from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
+from werkzeug.middleware.proxy_fix import ProxyFix
+from .cache import cache
+from .engine import configure_engine, engine_options, sqlite_pragmas
+from .passwords import hasher
+from .ratelimit import limiter
+from .replicas import RoutingSession, replica_binds
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 login_manager = LoginManager()
 
 def create_app():
@@ -15,6 +20,59 @@ def create_app():
     app.config.from_mapping(
         SECRET_KEY=os.environ.get('SECRET_KEY', 'dev-key-change-in-production'),
         SQLALCHEMY_TRACK_MODIFICATIONS=False,
+        PAGE_SIZE=int(os.environ.get('PAGE_SIZE', 20)),
+        PAGE_SIZE_MAX=int(os.environ.get('PAGE_SIZE_MAX', 100)),
+        # simple (in-process LRU), redis (needs CACHE_REDIS_URL) or null
+        CACHE_TYPE=os.environ.get('CACHE_TYPE', 'simple'),
+        CACHE_REDIS_URL=os.environ.get('CACHE_REDIS_URL'),
+        CACHE_DEFAULT_TIMEOUT=int(os.environ.get('CACHE_DEFAULT_TIMEOUT', 300)),
+        CACHE_MAX_ENTRIES=int(os.environ.get('CACHE_MAX_ENTRIES', 1024)),
+        # Seconds a logged-in user's identity is reused without a query; 0 disables
+        USER_CACHE_TTL=int(os.environ.get('USER_CACHE_TTL', 60)),
+        # Werkzeug method string, e.g. scrypt:32768:8:1 or pbkdf2:sha256:600000
+        PASSWORD_HASH_METHOD=os.environ.get('PASSWORD_HASH_METHOD'),
+        PASSWORD_HASH_WORKERS=int(os.environ.get('PASSWORD_HASH_WORKERS') or 0) or None,
+        PASSWORD_HASH_POOL=os.environ.get('PASSWORD_HASH_POOL', 'thread'),
+        # Rendered pages smaller than this many bytes are sent uncompressed
+        COMPRESS_MIN_SIZE=int(os.environ.get('COMPRESS_MIN_SIZE', 1024)),
+        COMPRESS_LEVEL=int(os.environ.get('COMPRESS_LEVEL', 6)),
+        # Requests/statements slower than this many milliseconds are logged
+        SLOW_REQUEST_MS=int(os.environ.get('SLOW_REQUEST_MS', 500)),
+        SLOW_QUERY_MS=int(os.environ.get('SLOW_QUERY_MS', 100)),
+        SERVER_TIMING=os.environ.get('SERVER_TIMING', '1') == '1',
+        # Bearer token that lets a Prometheus scraper read /admin/metrics without logging in
+        METRICS_TOKEN=os.environ.get('METRICS_TOKEN'),
+        # Share of requests whose stacks are sampled for /admin/profile (0 = only ?__profile=1)
+        PROFILE_SAMPLE_RATE=float(os.environ.get('PROFILE_SAMPLE_RATE', 0)),
+        PROFILE_INTERVAL_MS=int(os.environ.get('PROFILE_INTERVAL_MS', 5)),
+        # Background job threads per process (0 = only `flask jobs-work` runs jobs)
+        JOB_WORKERS=int(os.environ.get('JOB_WORKERS', 1)),
+        JOB_POLL_INTERVAL=float(os.environ.get('JOB_POLL_INTERVAL', 2)),
+        JOB_BATCH_SIZE=int(os.environ.get('JOB_BATCH_SIZE', 100)),
+        # Seconds a claimed job stays hidden from other workers before it is retried
+        JOB_VISIBILITY_TIMEOUT=int(os.environ.get('JOB_VISIBILITY_TIMEOUT', 300)),
+        JOB_MAX_ATTEMPTS=int(os.environ.get('JOB_MAX_ATTEMPTS', 5)),
+        # Admission control for login/register and join/leave (see ratelimit.py)
+        RATELIMIT_ENABLED=os.environ.get('RATELIMIT_ENABLED', '1') == '1',
+        # memory (per process) or redis (shared, RATELIMIT_REDIS_URL or CACHE_REDIS_URL)
+        RATELIMIT_STORAGE=os.environ.get('RATELIMIT_STORAGE', 'memory'),
+        RATELIMIT_REDIS_URL=os.environ.get('RATELIMIT_REDIS_URL'),
+        RATELIMIT_MAX_KEYS=int(os.environ.get('RATELIMIT_MAX_KEYS', 10000)),
+        # Bucket sizes as count/second|minute|hour; empty or 0 turns one off
+        RATE_LIMITS={
+            'auth': {'ip': os.environ.get('RATELIMIT_AUTH_IP', '30/minute'),
+                     'user': os.environ.get('RATELIMIT_AUTH_USER', '10/minute')},
+            'join': {'ip': os.environ.get('RATELIMIT_JOIN_IP', '120/minute'),
+                     'user': os.environ.get('RATELIMIT_JOIN_USER', '30/minute')},
+        },
+        # Requests of a class running at once per process (0 = no cap)
+        CONCURRENCY_LIMITS={
+            'auth': int(os.environ.get('CONCURRENCY_AUTH', 2)),
+            'join': int(os.environ.get('CONCURRENCY_JOIN', 4)),
+        },
+        # Reverse proxies in front of the app whose X-Forwarded-For is trusted
+        # (1 on Render); client IPs feed the rate limits
+        PROXY_HOPS=int(os.environ.get('PROXY_HOPS', 0)),
     )
 
     # DATABASE_URL can be provided by Render (Postgres) or left empty for SQLite
@@ -32,134 +90,61 @@ def create_app():
         db_path = os.path.join(app.instance_path, 'club_management.db')
         app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
 
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
+    app.config['SQLITE_PRAGMAS'] = sqlite_pragmas()
+    # Comma-separated read replica URLs; read-only views query them (see replicas.py)
+    app.config['SQLALCHEMY_BINDS'] = replica_binds(os.environ.get('DATABASE_REPLICA_URLS', ''), engine_options)
+    app.config['REPLICA_BINDS'] = list(app.config['SQLALCHEMY_BINDS'])
+    # Seconds after a user's write during which their reads stay on the primary
+    app.config['READ_YOUR_WRITES_SECONDS'] = float(os.environ.get('READ_YOUR_WRITES_SECONDS', 5))
+
     db.init_app(app)
+    from . import metrics, replicas
+    with app.app_context():
+        configure_engine(db.engine, app.config['SQLITE_PRAGMAS'])
+        metrics.init_app(app, db.engine)
+        for key in app.config['REPLICA_BINDS']:
+            configure_engine(db.engines[key], app.config['SQLITE_PRAGMAS'])
+            metrics.instrument(db.engines[key], 'replica')
+    replicas.init_app(app)
     login_manager.init_app(app)
     login_manager.login_view = 'auth.login'
+    cache.init_app(app)
+    hasher.init_app(app)
+    limiter.init_app(app)
+    if app.config['PROXY_HOPS']:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_HOPS'])
     
-    with app.app_context():
-        try:
-            from . import models
-            from .routes import auth_bp, club_bp, event_bp, main_bp
-            
-            app.register_blueprint(auth_bp, url_prefix='/auth')
-            app.register_blueprint(club_bp, url_prefix='/club')
-            app.register_blueprint(event_bp, url_prefix='/event')
-            app.register_blueprint(main_bp)
-            
-            db.create_all()
-            # Ensure new columns exist on existing DB (simple ALTER for SQLite)
-            try:
-                inspector = inspect(db.engine)
-                cols = [c['name'] for c in inspector.get_columns('club')]
-                if 'image_url' not in cols:
-                    with db.engine.begin() as conn:
-                        conn.execute(text("ALTER TABLE club ADD COLUMN image_url VARCHAR(255)"))
-            except Exception:
-                # If introspection or ALTER fails, continue quietly — seeding will handle missing columns
-                import traceback
-                traceback.print_exc()
-            # Seed sample data if DB is empty or incomplete
-            try:
-                from .models import User, Club, Event
-                import datetime
-                import random
+    from . import models
+    from .routes import auth_bp, club_bp, event_bp, main_bp
 
-                # 1. Ensure Users Exist
-                admin = User.query.filter_by(username='admin').first()
-                if not admin:
-                    admin = User(username='admin', email='admin@example.com', role='admin')
-                    admin.set_password('adminpass')
-                    db.session.add(admin)
-                    db.session.commit()
+    app.register_blueprint(auth_bp, url_prefix='/auth')
+    app.register_blueprint(club_bp, url_prefix='/club')
+    app.register_blueprint(event_bp, url_prefix='/event')
+    app.register_blueprint(main_bp)
 
-                users = [admin]
-                user_names = ['alice', 'berat', 'efe', 'mehmet', 'ayse', 'fatma', 'ali', 'veli', 'zeynep', 'can']
-                
-                for name in user_names:
-                    u = User.query.filter_by(username=name).first()
-                    if not u:
-                        u = User(username=name, email=f'{name}@example.com')
-                        u.set_password('password123')
-                        db.session.add(u)
-                    users.append(u)
-                db.session.commit()
-                
-                all_users = User.query.all()
+    from .cli import register_commands
+    register_commands(app)
 
-                # 2. Sync Clubs (Create needed, Update existing, Delete unwanted)
-                target_clubs = [
-                    {'name': 'Bilişim ve Teknoloji Kulübü', 'desc': 'Yazılım, donanım ve teknoloji çalışmalarına odaklı kulüp.', 'img': 'teknoloji.jpg'},
-                    {'name': 'Spor ve Yaşam Kulübü', 'desc': 'Farklı spor dallarında etkinlikler ve turnuvalar.', 'img': 'spor.jpg'},
-                    {'name': 'Güzel Sanatlar Kulübü', 'desc': 'Resim ve heykel çalışmaları.', 'img': 'sanat.jpg'},
-                    {'name': 'Müzik Topluluğu', 'desc': 'Müzik pratikleri, konserler ve performanslar.', 'img': 'muzik.jpg'},
-                    {'name': 'Edebiyat ve Kültür Kulübü', 'desc': 'Okuma grupları ve edebi etkinlikler.', 'img': 'edebiyat.jpg'},
-                    {'name': 'Sahne Sanatları Kulübü', 'desc': 'Sahne sanatları ve oyunculuk atölyeleri.', 'img': 'tiyatro.jpg'}
-                ]
-                
-                target_names = [c['name'] for c in target_clubs]
-                
-                # Delete clubs not in target list
-                existing_clubs = Club.query.all()
-                for club in existing_clubs:
-                    if club.name not in target_names:
-                        Event.query.filter_by(club_id=club.id).delete()
-                        club.members = []
-                        db.session.delete(club)
-                db.session.commit()
-                
-                # Create or Update target clubs
-                for data in target_clubs:
-                    club = Club.query.filter_by(name=data['name']).first()
-                    image_path = f'/static/img/{data["img"]}'
-                    
-                    if club:
-                        club.description = data['desc']
-                        club.image_url = image_path
-                    else:
-                        president = random.choice(all_users)
-                        club = Club(
-                            name=data['name'],
-                            description=data['desc'],
-                            image_url=image_path,
-                            president_id=president.id
-                        )
-                        db.session.add(club)
-                    db.session.commit()
+    from .pagination import page_url
+    app.jinja_env.globals['page_url'] = page_url
+    from .cache import cache_fragment
+    app.jinja_env.globals['cache_fragment'] = cache_fragment
+    from . import assets, images, profiling, responses
+    from .jobs import queue
+    queue.init_app(app)
+    assets.init_app(app)
+    images.init_app(app)
+    responses.init_app(app)
+    profiling.init_app(app)
 
-                # 3. Ensure Events and Members Exist
-                clubs = Club.query.all()
-                for club in clubs:
-                    # Ensure at least 1 event
-                    if not club.events:
-                        for j in range(random.randint(1, 2)):
-                            days_offset = random.randint(5, 30)
-                            ev = Event(
-                                name=f'{club.name} Etkinliği {j+1}', 
-                                description=f'{club.name} tarafından düzenlenen harika bir etkinlik.', 
-                                date=datetime.datetime.now() + datetime.timedelta(days=days_offset), 
-                                location='Kampüs Merkezi', 
-                                club_id=club.id, 
-                                image_url=club.image_url
-                            )
-                            db.session.add(ev)
-                    
-                    # Ensure some members
-                    if not club.members:
-                        potential_members = [u for u in all_users if u.id != club.president_id]
-                        if potential_members:
-                            members_to_add = random.sample(potential_members, k=min(len(potential_members), random.randint(3, 6)))
-                            for m in members_to_add:
-                                club.members.append(m)
-                    
-                    db.session.commit()
+    # Schema patching and seeding run through `flask db-upgrade` / `flask seed`.
+    # AUTO_SEED=1 keeps the old run-on-startup behaviour for local development.
+    if os.environ.get('AUTO_SEED') == '1':
+        from .schema import upgrade_schema
+        from .seed import seed_data
+        with app.app_context():
+            upgrade_schema()
+            seed_data()
 
-            except Exception:
-                import traceback
-                traceback.print_exc()
-        except Exception as e:
-            print(f"Error during app initialization: {e}")
-            import traceback
-            traceback.print_exc()
-            raise
-    
     return app
@@ -0,0 +1,113 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+
+from flask import current_app, request, send_from_directory, url_for
+
+# Content-hashed copies of everything in static/ live under static/dist,
+# e.g. css/style.css -> dist/css/style.3f2a1b9c0d.css, with .gz/.br siblings
+# for text assets. `flask assets` builds them; asset_url() maps a source path
+# to its hashed URL, and hashed files are served with a one-year immutable
+# Cache-Control so repeat visits don't revalidate them.
+DIST_DIR = 'dist'
+MANIFEST = 'dist/manifest.json'
+COMPRESSIBLE = ('.css', '.js', '.svg', '.json', '.txt', '.html', '.map')
+MIN_COMPRESS_BYTES = 256
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+def _fingerprint(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:10]
+
+
+def _compress(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < MIN_COMPRESS_BYTES:
+        return []
+    written = []
+    with gzip.open(path + '.gz', 'wb', compresslevel=9) as f:
+        f.write(data)
+    written.append(path + '.gz')
+    try:
+        import brotli
+    except ImportError:
+        return written
+    with open(path + '.br', 'wb') as f:
+        f.write(brotli.compress(data, quality=11))
+    written.append(path + '.br')
+    return written
+
+
+def build_assets(static_folder):
+    dist = os.path.join(static_folder, DIST_DIR)
+    shutil.rmtree(dist, ignore_errors=True)
+    manifest = {}
+    compressed = 0
+    for root, dirs, files in os.walk(static_folder):
+        dirs[:] = [d for d in dirs if os.path.join(root, d) != dist]
+        for filename in files:
+            source = os.path.join(root, filename)
+            rel = os.path.relpath(source, static_folder).replace(os.sep, '/')
+            stem, ext = os.path.splitext(rel)
+            hashed = f'{DIST_DIR}/{stem}.{_fingerprint(source)}{ext}'
+            target = os.path.join(static_folder, hashed)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copyfile(source, target)
+            if ext.lower() in COMPRESSIBLE:
+                compressed += len(_compress(target))
+            manifest[rel] = hashed
+
+    with open(os.path.join(static_folder, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest, compressed
+
+
+def load_manifest(app):
+    try:
+        with open(os.path.join(app.static_folder, MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def asset_url(filename):
+    # Hashed URL when `flask assets` has been run, plain static URL otherwise
+    hashed = current_app.extensions['asset_manifest'].get(filename)
+    return url_for('static', filename=hashed or filename)
+
+
+def static_view(filename):
+    # Replaces Flask's static view: hashed files get far-future caching and a
+    # precompressed sibling when the client accepts it; everything else is
+    # served exactly as before
+    if not filename.startswith(DIST_DIR + '/'):
+        return current_app.send_static_file(filename)
+
+    folder = current_app.static_folder
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    served, encoding = filename, None
+    for enc, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if enc in request.accept_encodings and os.path.isfile(os.path.join(folder, filename + suffix)):
+            served, encoding = filename + suffix, enc
+            break
+
+    response = send_from_directory(folder, served, mimetype=mimetype, max_age=31536000)
+    response.headers['Cache-Control'] = IMMUTABLE
+    response.vary.add('Accept-Encoding')
+    if encoding:
+        response.content_encoding = encoding
+    return response
+
+
+def init_app(app):
+    app.extensions['asset_manifest'] = load_manifest(app)
+    app.view_functions['static'] = static_view
+    app.jinja_env.globals['asset_url'] = asset_url
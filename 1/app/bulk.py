@@ -0,0 +1,193 @@
+import csv
+import datetime
+import json
+from itertools import islice
+
+from sqlalchemy import insert, select
+
+from . import db
+from .counters import recount
+from .models import User, Club, Event, club_members, insert_ignore
+from .passwords import hasher
+
+# Streaming CSV/JSONL import and export for `flask import` / `flask export`.
+# Imports read and insert fixed-size chunks (one executemany and one commit
+# each) and exports stream rows with yield_per, so memory use depends on the
+# chunk size, not on the size of the file or table.
+KINDS = ('users', 'clubs', 'memberships', 'events')
+
+EXPORT_FIELDS = {
+    'users': ['id', 'username', 'email', 'role', 'created_at'],
+    'clubs': ['id', 'name', 'description', 'image_url', 'president', 'created_at'],
+    'memberships': ['username', 'club'],
+    'events': ['id', 'name', 'description', 'date', 'location', 'club', 'image_url'],
+}
+
+
+def read_rows(fileobj, fmt):
+    if fmt == 'csv':
+        yield from csv.DictReader(fileobj)
+    else:
+        for line_no, line in enumerate(fileobj, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                raise ValueError(f'Satır {line_no}: geçersiz JSON')
+
+
+def _chunks(rows, size):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _ids_by(column, key_column, values):
+    # name -> id for one chunk only, so lookups never load a whole table
+    values = {v for v in values if v}
+    if not values:
+        return {}
+    return dict(db.session.execute(select(column, key_column).where(column.in_(values))).all())
+
+
+def _insert(table, rows):
+    if not rows:
+        return 0
+    stmt = insert_ignore(table)
+    result = db.session.execute(stmt if stmt is not None else insert(table), rows)
+    # executemany rowcount is the number of rows actually inserted where supported
+    return result.rowcount if result.rowcount >= 0 else len(rows)
+
+
+def _user_rows(chunk):
+    plain = [row.get('password') for row in chunk]
+    need_hash = [i for i, pw in enumerate(plain) if pw and not chunk[i].get('password_hash')]
+    hashes = dict(zip(need_hash, hasher.hash_many([plain[i] for i in need_hash])))
+    rows = []
+    for i, row in enumerate(chunk):
+        pwhash = row.get('password_hash') or hashes.get(i)
+        if not row.get('username') or not row.get('email') or not pwhash:
+            raise ValueError(f"Kullanıcı satırı eksik: {row.get('username') or row}")
+        rows.append({'username': row['username'], 'email': row['email'],
+                     'password_hash': pwhash, 'role': row.get('role') or 'member'})
+    return User.__table__, rows
+
+
+def _club_rows(chunk):
+    # Memberships and events refer to clubs by name, so a name that already
+    # exists (in the table or earlier in the chunk) is skipped rather than
+    # duplicated; importing the same file twice leaves the clubs as they were
+    presidents = _ids_by(User.username, User.id, [r.get('president') for r in chunk])
+    seen = set(_ids_by(Club.name, Club.id, [r.get('name') for r in chunk]))
+    rows = []
+    for row in chunk:
+        if row['name'] in seen:
+            continue
+        seen.add(row['name'])
+        president_id = row.get('president_id') or presidents.get(row.get('president'))
+        rows.append({'name': row['name'], 'description': row.get('description'),
+                     'image_url': row.get('image_url'),
+                     'president_id': int(president_id) if president_id else None})
+    return Club.__table__, rows
+
+
+def _membership_rows(chunk):
+    users = _ids_by(User.username, User.id, [r.get('username') for r in chunk])
+    clubs = _ids_by(Club.name, Club.id, [r.get('club') for r in chunk])
+    rows = []
+    for row in chunk:
+        user_id = row.get('user_id') or users.get(row.get('username'))
+        club_id = row.get('club_id') or clubs.get(row.get('club'))
+        if not user_id or not club_id:
+            raise ValueError(f'Üyelik çözümlenemedi: {row}')
+        rows.append({'user_id': int(user_id), 'club_id': int(club_id)})
+    return club_members, rows
+
+
+def _event_rows(chunk):
+    clubs = _ids_by(Club.name, Club.id, [r.get('club') for r in chunk])
+    rows = []
+    for row in chunk:
+        club_id = row.get('club_id') or clubs.get(row.get('club'))
+        if not club_id:
+            raise ValueError(f"Etkinliğin kulübü bulunamadı: {row.get('name')}")
+        rows.append({'name': row['name'], 'description': row.get('description'),
+                     'date': datetime.datetime.fromisoformat(row['date']),
+                     'location': row.get('location'), 'club_id': int(club_id),
+                     'image_url': row.get('image_url')})
+    if not rows:
+        return Event.__table__, rows
+    # Events have no natural unique key; (club, name, date) stands in for one
+    # so importing the same file twice doesn't duplicate them
+    existing = set(db.session.execute(
+        select(Event.club_id, Event.name, Event.date)
+        .where(Event.club_id.in_({r['club_id'] for r in rows}),
+               Event.name.in_({r['name'] for r in rows}))).all())
+    return Event.__table__, [r for r in rows if (r['club_id'], r['name'], r['date']) not in existing]
+
+
+ROW_BUILDERS = {
+    'users': _user_rows,
+    'clubs': _club_rows,
+    'memberships': _membership_rows,
+    'events': _event_rows,
+}
+
+
+def import_rows(kind, rows, batch_size=1000):
+    # Returns (rows read, rows inserted); rows that already exist are skipped
+    build = ROW_BUILDERS[kind]
+    read = inserted = 0
+    for chunk in _chunks(rows, batch_size):
+        table, values = build(chunk)
+        inserted += _insert(table, values)
+        if table is club_members:
+            # Same transaction as the insert, so the counts never lag behind
+            recount('members', {row['club_id'] for row in values})
+        db.session.commit()
+        read += len(chunk)
+    return read, inserted
+
+
+def _export_query(kind):
+    if kind == 'users':
+        return select(User.id, User.username, User.email, User.role, User.created_at).order_by(User.id)
+    if kind == 'clubs':
+        return (select(Club.id, Club.name, Club.description, Club.image_url,
+                       User.username.label('president'), Club.created_at)
+                .outerjoin(User, User.id == Club.president_id).order_by(Club.id))
+    if kind == 'memberships':
+        return (select(User.username, Club.name.label('club'))
+                .select_from(club_members)
+                .join(User, User.id == club_members.c.user_id)
+                .join(Club, Club.id == club_members.c.club_id)
+                .order_by(club_members.c.club_id, club_members.c.user_id))
+    return (select(Event.id, Event.name, Event.description, Event.date, Event.location,
+                   Club.name.label('club'), Event.image_url)
+            .join(Club, Club.id == Event.club_id).order_by(Event.id))
+
+
+def _plain(value):
+    return value.isoformat() if isinstance(value, datetime.datetime) else value
+
+
+def export_rows(kind, out, fmt, batch_size=1000):
+    fields = EXPORT_FIELDS[kind]
+    writer = csv.DictWriter(out, fieldnames=fields) if fmt == 'csv' else None
+    if writer:
+        writer.writeheader()
+    result = db.session.execute(_export_query(kind).execution_options(yield_per=batch_size))
+    count = 0
+    for row in result:
+        record = {field: _plain(value) for field, value in zip(fields, row)}
+        if writer:
+            writer.writerow(record)
+        else:
+            out.write(json.dumps(record, ensure_ascii=False) + '\n')
+        count += 1
+    return count
@@ -0,0 +1,262 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, g, request, session, make_response
+from flask_login import current_user
+from markupsafe import Markup
+
+
+class CacheBackend:
+    # Minimal interface every backend implements. Values are arbitrary
+    # picklable objects; ttl is in seconds (None = backend default).
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value, ttl=None):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def incr(self, key):
+        raise NotImplementedError
+
+    def counter(self, key):
+        # Current value of a key only ever written by incr(), 0 if unset
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class NullCache(CacheBackend):
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl=None):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def incr(self, key):
+        return 0
+
+    def counter(self, key):
+        return 0
+
+    def clear(self):
+        pass
+
+
+class LRUCache(CacheBackend):
+    # In-process cache: least recently used entries are evicted once
+    # max_entries is reached, and entries expire after their ttl.
+
+    def __init__(self, max_entries=1024, default_ttl=300):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires is not None and expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        expires = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def incr(self, key):
+        with self._lock:
+            value = self._data.get(key, (0, None))[0] + 1
+            self._data[key] = (value, None)
+            self._data.move_to_end(key)
+            return value
+
+    def counter(self, key):
+        return self.get(key) or 0
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class RedisCache(CacheBackend):
+    # Wraps any client with the redis-py get/set/delete/incr API, so a real
+    # Redis or a local stand-in (e.g. fakeredis) can be shared by workers.
+
+    def __init__(self, client, default_ttl=300, prefix='cms:'):
+        self.client = client
+        self.default_ttl = default_ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return None if raw is None else pickle.loads(raw)
+
+    def set(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        self.client.set(self.prefix + key, pickle.dumps(value), ex=ttl or None)
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def incr(self, key):
+        return self.client.incr(self.prefix + key)
+
+    def counter(self, key):
+        # INCR stores a plain integer, not a pickle
+        return int(self.client.get(self.prefix + key) or 0)
+
+    def clear(self):
+        keys = list(self.client.scan_iter(self.prefix + '*'))
+        if keys:
+            self.client.delete(*keys)
+
+
+class Cache:
+    # Front for the configured backend. Invalidation is by namespace: keys
+    # embed the current version of each namespace they depend on, and bump()
+    # moves the version on so every dependent entry is skipped from then on.
+
+    def __init__(self):
+        self.backend = NullCache()
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        cache_type = app.config.get('CACHE_TYPE', 'simple')
+        ttl = app.config.get('CACHE_DEFAULT_TIMEOUT', 300)
+        if cache_type == 'null':
+            self.backend = NullCache()
+        elif cache_type == 'redis':
+            import redis
+            client = redis.Redis.from_url(app.config['CACHE_REDIS_URL'])
+            self.backend = RedisCache(client, default_ttl=ttl)
+        else:
+            self.backend = LRUCache(app.config.get('CACHE_MAX_ENTRIES', 1024), ttl)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        value = self.backend.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key, value, ttl=None):
+        self.backend.set(key, value, ttl)
+
+    def version(self, namespace):
+        return self.backend.counter(f'ns:{namespace}')
+
+    def bump(self, *namespaces):
+        for namespace in namespaces:
+            self.backend.incr(f'ns:{namespace}')
+
+    def key(self, prefix, namespaces):
+        versions = ','.join(f'{ns}={self.version(ns)}' for ns in namespaces)
+        return f'{prefix}|{versions}'
+
+    def clear(self):
+        self.backend.clear()
+
+    @property
+    def enabled(self):
+        return not isinstance(self.backend, NullCache)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'backend': type(self.backend).__name__,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+cache = Cache()
+
+
+def _anonymous_get():
+    # Pages differ per user (nav bar, buttons) and carry one-off flash
+    # messages, so only plain anonymous GETs are shared
+    return (request.method == 'GET'
+            and not current_user.is_authenticated
+            and '_flashes' not in session)
+
+
+def fill_from_primary():
+    # Called on a cache miss before querying: entries are filled from the
+    # primary only, since one built from a lagging replica would be stored
+    # under the version a write just bumped and served until it expires, long
+    # after the replica caught up
+    if cache.enabled:
+        g.pop('replica', None)
+
+
+def cached_page(*namespaces, ttl=None):
+    # Caches the whole response for anonymous visitors. Namespaces may use the
+    # view arguments, e.g. @cached_page('club:{club_id}').
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**kwargs):
+            if not _anonymous_get():
+                return view(**kwargs)
+
+            from .pagination import wants_json
+            variant = 'json' if wants_json() else 'html'
+            key = cache.key(f'page:{variant}:{request.full_path}',
+                            [ns.format(**kwargs) for ns in namespaces])
+            hit = cache.get(key)
+            if hit is not None:
+                body, mimetype = hit
+                response = current_app.response_class(body, mimetype=mimetype)
+                response.headers['X-Cache'] = 'HIT'
+                return response
+
+            fill_from_primary()
+            response = make_response(view(**kwargs))
+            if response.status_code == 200 and not response.direct_passthrough:
+                cache.set(key, (response.get_data(), response.mimetype), ttl)
+            response.headers['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
+
+
+def cache_fragment(name, *namespaces, caller):
+    # Jinja call block: {% call cache_fragment('club_card', 'club:%d' % club.id) %}
+    # Must only wrap markup that is the same for every visitor.
+    key = cache.key(f'fragment:{name}', namespaces)
+    html = cache.get(key)
+    if html is None:
+        html = str(caller())
+        # Markup built from replica reads may be stale; show it, don't share it
+        if not g.get('replica'):
+            cache.set(key, html)
+    return Markup(html)
@@ -0,0 +1,155 @@
+import sys
+import time
+
+import click
+
+from . import bulk, db, jobs
+from .assets import build_assets
+from .cache import cache
+from .counters import COUNTERS, mismatches, recount_all
+from .images import build_variants
+from .replicas import replicate
+from .schema import upgrade_schema
+from .search import reindex
+from .seed import seed_data
+
+
+def register_commands(app):
+
+    @app.cli.command('db-upgrade')
+    def db_upgrade_command():
+        """Create missing tables, columns and indexes."""
+        applied = upgrade_schema()
+        for name in applied:
+            click.echo(f'Applied {name}')
+        click.echo('Schema is up to date.')
+
+    @app.cli.command('seed')
+    def seed_command():
+        """Insert or sync the sample users, clubs, events and members."""
+        seed_data()
+        click.echo('Seed data is in place.')
+
+    @app.cli.command('search-reindex')
+    def search_reindex_command():
+        """Rebuild the club and event full-text search indexes."""
+        counts = reindex()
+        click.echo(f"Indexed {counts['club']} clubs and {counts['event']} events.")
+
+    @app.cli.command('recount')
+    @click.option('--check', is_flag=True, help='Only report drifted counts; exit 1 if there are any.')
+    def recount_command(check):
+        """Repair the stored club member and event attendee counts."""
+        if check:
+            drifted = 0
+            for name in COUNTERS:
+                rows = mismatches(name)
+                drifted += len(rows)
+                for row_id, stored, actual in rows[:20]:
+                    click.echo(f'{name}: id {row_id} stored {stored}, actual {actual}')
+                if len(rows) > 20:
+                    click.echo(f'{name}: ... and {len(rows) - 20} more')
+            if drifted:
+                raise click.ClickException(f'{drifted} counts are out of date; run `flask recount`.')
+            click.echo('All counts are consistent.')
+            return
+        fixed = recount_all()
+        db.session.commit()
+        cache.bump('clubs', 'events')
+        click.echo(', '.join(f'{name}: fixed {count}' for name, count in fixed.items()))
+
+    @app.cli.command('jobs')
+    def jobs_command():
+        """Show background jobs by kind and status."""
+        counts = jobs.status_counts()
+        for (kind, status), count in sorted(counts.items()):
+            click.echo(f'{kind:<20} {status:<8} {count}')
+        if not counts:
+            click.echo('No background jobs.')
+
+    @app.cli.command('jobs-work')
+    @click.option('--once', is_flag=True, help='Exit when no job is due instead of polling.')
+    def jobs_work_command(once):
+        """Run background jobs in the foreground."""
+        if once:
+            click.echo(f'Ran {jobs.run_pending()} jobs.')
+            return
+        jobs.queue.work()
+
+    @app.cli.command('jobs-retry')
+    def jobs_retry_command():
+        """Queue failed background jobs again."""
+        click.echo(f'Requeued {jobs.retry_failed()} failed jobs.')
+
+    @app.cli.command('replicate')
+    @click.option('--interval', type=float, help='Keep copying every this many seconds.')
+    def replicate_command(interval):
+        """Copy the SQLite primary into the SQLite replicas (local stand-in for replication)."""
+        if not app.config['REPLICA_BINDS']:
+            raise click.ClickException('DATABASE_REPLICA_URLS is not set.')
+        while True:
+            try:
+                paths = replicate(db)
+            except ValueError as e:
+                raise click.ClickException(str(e))
+            click.echo(f"Copied primary to {', '.join(paths)}")
+            if not interval:
+                return
+            time.sleep(interval)
+
+    @app.cli.command('images')
+    def images_command():
+        """Build resized AVIF/WebP/JPEG variants of static/img and their manifest."""
+        try:
+            manifest, skipped = build_variants(app.static_folder)
+        except RuntimeError as e:
+            raise click.ClickException(str(e))
+        for source, entry in manifest.items():
+            smallest = min(v['bytes'] for v in entry['variants'])
+            click.echo(f"{source}: {entry['bytes'] // 1024} KB -> {len(entry['variants'])} variants, "
+                       f"smallest {smallest // 1024} KB")
+        for source in skipped:
+            click.echo(f'Skipped unreadable image {source}')
+
+    @app.cli.command('assets')
+    def assets_command():
+        """Copy static files to content-hashed names with .gz/.br siblings."""
+        manifest, compressed = build_assets(app.static_folder)
+        click.echo(f'Fingerprinted {len(manifest)} files, wrote {compressed} precompressed copies.')
+
+    def _format(path, fmt):
+        if fmt:
+            return fmt
+        return 'jsonl' if path.endswith(('.jsonl', '.json')) else 'csv'
+
+    @app.cli.command('import')
+    @click.argument('kind', type=click.Choice(bulk.KINDS))
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']))
+    @click.option('--batch-size', default=1000, show_default=True)
+    def import_command(kind, path, fmt, batch_size):
+        """Stream users, clubs, memberships or events from a CSV/JSONL file."""
+        with open(path, newline='', encoding='utf-8') as f:
+            try:
+                read, inserted = bulk.import_rows(kind, bulk.read_rows(f, _format(path, fmt)), batch_size)
+            except (KeyError, ValueError) as e:
+                raise click.ClickException(f'Import stopped: {e}')
+        if kind in ('clubs', 'events') and inserted:
+            reindex(batch_size)
+        cache.bump('clubs', 'events')
+        click.echo(f'Read {read} {kind}, inserted {inserted}, skipped {read - inserted} existing.')
+
+    @app.cli.command('export')
+    @click.argument('kind', type=click.Choice(bulk.KINDS))
+    @click.argument('path', default='-')
+    @click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']))
+    @click.option('--batch-size', default=1000, show_default=True)
+    def export_command(kind, path, fmt, batch_size):
+        """Stream users, clubs, memberships or events to a CSV/JSONL file (or stdout)."""
+        fmt = _format(path, fmt)
+        if path == '-':
+            count = bulk.export_rows(kind, sys.stdout, fmt, batch_size)
+        else:
+            with open(path, 'w', newline='', encoding='utf-8') as f:
+                count = bulk.export_rows(kind, f, fmt, batch_size)
+        click.echo(f'Exported {count} {kind}.', err=True)
@@ -0,0 +1,48 @@
+from sqlalchemy import func, select, update
+from . import db
+from .models import Club, Event, club_members, event_attendees
+
+# Club.member_count and Event.attendee_count are denormalized: add_member /
+# remove_member and Event.join / Event.leave adjust them in the same
+# transaction as the row they insert or delete. Writers that go around those
+# helpers (bulk imports, the seed, the benchmark generator) recount the rows
+# they touched. `flask recount` repairs any drift; `--check` only reports it.
+#
+# name -> (model, counter column, association table, its foreign key)
+COUNTERS = {
+    'members': (Club, 'member_count', club_members, 'club_id'),
+    'attendees': (Event, 'attendee_count', event_attendees, 'event_id'),
+}
+
+
+def _actual(name):
+    model, _, table, key = COUNTERS[name]
+    return (select(func.count()).where(table.c[key] == model.id)
+            .correlate(model).scalar_subquery())
+
+
+def recount(name, ids=None):
+    # Rewrites the counters that are off, for the given ids or all rows.
+    # Runs in the caller's transaction; returns how many rows were fixed.
+    model, column, _, _ = COUNTERS[name]
+    counter = getattr(model, column)
+    actual = _actual(name)
+    stmt = update(model).where(counter != actual).values({column: actual})
+    if ids is not None:
+        stmt = stmt.where(model.id.in_(ids))
+    return db.session.execute(stmt.execution_options(synchronize_session=False)).rowcount
+
+
+def recount_all():
+    return {name: recount(name) for name in COUNTERS}
+
+
+def mismatches(name, limit=None):
+    # (id, stored count, actual count) for every row whose counter is off
+    model, column, _, _ = COUNTERS[name]
+    counter = getattr(model, column)
+    actual = _actual(name)
+    query = select(model.id, counter, actual).where(counter != actual).order_by(model.id)
+    if limit:
+        query = query.limit(limit)
+    return db.session.execute(query).all()
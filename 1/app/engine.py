@@ -0,0 +1,49 @@
+import json
+import os
+
+from sqlalchemy import event
+
+
+def engine_options(database_uri):
+    # SQLALCHEMY_ENGINE_OPTIONS built from DB_* environment variables.
+    # A JSON object in SQLALCHEMY_ENGINE_OPTIONS overrides individual keys.
+    if database_uri.startswith('sqlite'):
+        # pysqlite's own lock wait, in seconds; the PRAGMA below sets the same limit
+        options = {'connect_args': {'timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000)) / 1000}}
+    else:
+        options = {
+            'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+            'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+            'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 30)),
+            # Render/Heroku Postgres drops idle connections; recycle before that
+            'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+            'pool_pre_ping': os.environ.get('DB_POOL_PRE_PING', '1') == '1',
+        }
+    override = os.environ.get('SQLALCHEMY_ENGINE_OPTIONS')
+    if override:
+        options.update(json.loads(override))
+    return options
+
+
+def sqlite_pragmas():
+    return {
+        # WAL lets readers run alongside the single writer instead of blocking on it
+        'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+        # NORMAL is durable across application crashes in WAL mode and skips most fsyncs
+        'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000)),
+        'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+    }
+
+
+def configure_engine(engine, pragmas):
+    # Apply the SQLite pragmas on every new pooled connection
+    if engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
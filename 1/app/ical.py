@@ -0,0 +1,60 @@
+from datetime import datetime
+
+from flask import request, url_for
+
+# Minimal RFC 5545 writer for the event feeds. Event dates are stored as
+# naive local times, so they are written as floating DTSTART values.
+PRODID = '-//Kulup Yonetim Sistemi//Etkinlikler//TR'
+
+
+def _escape(text):
+    return (text or '').replace('\\', '\\\\').replace(';', '\\;') \
+        .replace(',', '\\,').replace('\r\n', '\\n').replace('\n', '\\n')
+
+
+def _fold(line):
+    # Content lines are limited to 75 octets; continuations start with a space
+    data = line.encode('utf-8')
+    if len(data) <= 75:
+        return line
+    parts = []
+    while data:
+        size = 75 if not parts else 74
+        # Never split inside a multi-byte UTF-8 sequence
+        while size < len(data) and (data[size] & 0xC0) == 0x80:
+            size -= 1
+        parts.append(data[:size].decode('utf-8'))
+        data = data[size:]
+    return '\r\n '.join(parts)
+
+
+def _stamp(value):
+    return value.strftime('%Y%m%dT%H%M%S')
+
+
+def render_calendar(events, name):
+    host = request.host.split(':')[0]
+    now = _stamp(datetime.utcnow()) + 'Z'
+    lines = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f'PRODID:{PRODID}',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{_escape(name)}',
+    ]
+    for event in events:
+        lines += [
+            'BEGIN:VEVENT',
+            f'UID:event-{event.id}@{host}',
+            f'DTSTAMP:{now}',
+            f'DTSTART:{_stamp(event.date)}',
+            f'SUMMARY:{_escape(event.name)}',
+            f'DESCRIPTION:{_escape(event.description)}',
+            f'LOCATION:{_escape(event.location)}',
+            f'CATEGORIES:{_escape(event.club.name)}',
+            f"URL:{url_for('event.view_event', event_id=event.id, _external=True)}",
+            'END:VEVENT',
+        ]
+    lines.append('END:VCALENDAR')
+    return '\r\n'.join(_fold(line) for line in lines) + '\r\n'
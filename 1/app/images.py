@@ -0,0 +1,139 @@
+import json
+import os
+
+from flask import current_app
+
+from .assets import asset_url
+from markupsafe import Markup, escape
+
+# Responsive variants of the raster images in static/img. `flask images`
+# writes them to static/img/variants together with a manifest; the picture()
+# template helper turns the manifest into <picture>/srcset markup.
+SOURCE_DIR = 'img'
+VARIANT_DIR = 'img/variants'
+MANIFEST = 'img/variants/manifest.json'
+WIDTHS = (320, 640, 1024, 1600)
+SOURCE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+MIME_TYPES = {'avif': 'image/avif', 'webp': 'image/webp', 'jpg': 'image/jpeg', 'png': 'image/png'}
+
+
+def build_variants(static_folder, widths=WIDTHS, quality=75):
+    # Needs Pillow, which is only required where this command runs
+    try:
+        from PIL import Image, UnidentifiedImageError, features
+    except ImportError:
+        raise RuntimeError('Görsel varyantları için Pillow gerekli: pip install Pillow')
+
+    formats = ['webp']
+    if features.check('avif'):
+        formats.insert(0, 'avif')
+
+    out_dir = os.path.join(static_folder, VARIANT_DIR)
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = {}
+    skipped = []
+    for filename in sorted(os.listdir(os.path.join(static_folder, SOURCE_DIR))):
+        if not filename.lower().endswith(SOURCE_EXTENSIONS):
+            continue
+        source = f'{SOURCE_DIR}/{filename}'
+        try:
+            image = Image.open(os.path.join(static_folder, source))
+            image.load()
+        except (UnidentifiedImageError, OSError):
+            skipped.append(source)
+            continue
+
+        has_alpha = image.mode in ('RGBA', 'LA') or 'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+        # Photos fall back to JPEG; only images with transparency stay PNG
+        fallback = 'png' if has_alpha else 'jpg'
+        stem = os.path.splitext(filename)[0]
+
+        # Never upscale; the largest variant is at most the original width
+        sizes = sorted({w for w in widths if w < image.width} | {min(image.width, max(widths))})
+        variants = []
+        for width in sizes:
+            height = round(image.height * width / image.width)
+            resized = image.resize((width, height), Image.LANCZOS)
+            for fmt in formats + [fallback]:
+                path = f'{VARIANT_DIR}/{stem}-{width}.{fmt}'
+                target = os.path.join(static_folder, path)
+                if fmt == 'jpg':
+                    resized.save(target, 'JPEG', quality=quality + 5, optimize=True, progressive=True)
+                elif fmt == 'png':
+                    resized.save(target, 'PNG', optimize=True)
+                elif fmt == 'avif':
+                    # AVIF's quality scale runs lower for the same visual result
+                    resized.save(target, 'AVIF', quality=quality - 25)
+                else:
+                    resized.save(target, 'WEBP', quality=quality)
+                variants.append({'path': path, 'width': width, 'type': MIME_TYPES[fmt],
+                                 'bytes': os.path.getsize(target)})
+
+        manifest[source] = {
+            'width': image.width,
+            'height': image.height,
+            'bytes': os.path.getsize(os.path.join(static_folder, source)),
+            'variants': variants,
+        }
+
+    with open(os.path.join(static_folder, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest, skipped
+
+
+def load_manifest(app):
+    path = os.path.join(app.static_folder, MANIFEST)
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _static_path(src):
+    # Accepts 'img/x.jpg' as well as the '/static/img/x.jpg' URLs stored on clubs
+    prefix = current_app.static_url_path.rstrip('/') + '/'
+    return src[len(prefix):] if src.startswith(prefix) else src.lstrip('/')
+
+
+def picture(src, alt='', sizes='100vw', **attrs):
+    # <picture> with AVIF/WebP sources and a JPEG/PNG srcset. Falls back to a
+    # plain <img> for SVGs, external URLs and images without variants.
+    entry = current_app.extensions['image_manifest'].get(_static_path(src)) if src else None
+    attrs.setdefault('loading', 'lazy')
+    if 'class_' in attrs:
+        attrs['class'] = attrs.pop('class_')
+    if entry:
+        attrs.setdefault('width', entry['width'])
+        attrs.setdefault('height', entry['height'])
+    extra = ''.join(f' {name}="{escape(value)}"' for name, value in attrs.items())
+
+    if not entry:
+        url = src if src.startswith('http') else asset_url(_static_path(src))
+        return Markup(f'<img src="{escape(url)}" alt="{escape(alt)}"{extra}>')
+
+    by_type = {}
+    for variant in entry['variants']:
+        by_type.setdefault(variant['type'], []).append(variant)
+
+    def srcset(variants):
+        return ', '.join(f"{asset_url(v['path'])} {v['width']}w" for v in variants)
+
+    html = ['<picture>']
+    fallback = None
+    for mime, variants in by_type.items():
+        if mime in ('image/avif', 'image/webp'):
+            html.append(f'<source type="{mime}" srcset="{srcset(variants)}" sizes="{escape(sizes)}">')
+        else:
+            fallback = variants
+    largest = asset_url(fallback[-1]['path'])
+    html.append(f'<img src="{largest}" srcset="{srcset(fallback)}" sizes="{escape(sizes)}" '
+                f'alt="{escape(alt)}"{extra}>')
+    html.append('</picture>')
+    return Markup(''.join(html))
+
+
+def init_app(app):
+    app.extensions['image_manifest'] = load_manifest(app)
+    app.jinja_env.globals['picture'] = picture
@@ -0,0 +1,191 @@
+import json
+import os
+import threading
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import delete, event, func, select, update
+
+from . import db, metrics, search
+from .cache import cache
+from .models import Job
+
+# Background jobs for side effects that don't have to finish before the
+# response. A job is a row in the job table added in the same transaction as
+# the change that needs it, so a rolled-back request leaves no job behind and
+# a committed one never loses its follow-up work.
+#
+# Worker threads claim due jobs in batches of one kind: the claim stamps the
+# rows with a lease and moves run_at forward by the visibility timeout, so a
+# worker that dies mid-batch only delays the jobs until another one claims
+# them again. A handler gets every payload of the batch at once and runs in
+# the same transaction that deletes the finished jobs. Failed batches are
+# retried with exponential backoff and after JOB_MAX_ATTEMPTS stay in the
+# table as 'failed' (see `flask jobs`, `flask jobs-retry`).
+#
+# Threads start in a process the first time it commits a job, so processes
+# that only read (and the check scripts) never poll. With JOB_WORKERS=0 no
+# threads are started and `flask jobs-work` runs the queue instead.
+TASKS = {}
+DUE = ('queued', 'running')
+
+
+def task(kind):
+    def decorator(handler):
+        TASKS[kind] = handler
+        return handler
+    return decorator
+
+
+def enqueue(kind, **payload):
+    # Added to the caller's transaction; workers are woken when it commits
+    if kind not in TASKS:
+        raise KeyError(kind)
+    db.session.add(Job(kind=kind, payload=json.dumps(payload), run_at=datetime.now()))
+    db.session.info['jobs_enqueued'] = True
+
+
+@event.listens_for(db.session, 'after_commit')
+def _after_commit(session):
+    if session.info.pop('jobs_enqueued', False):
+        queue.start()
+        queue.wake()
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _after_rollback(session):
+    session.info.pop('jobs_enqueued', None)
+
+
+def claim(batch_size, visibility_timeout, max_attempts):
+    # Leases up to batch_size due jobs of the oldest due kind; returns them
+    now = datetime.now()
+    due = (Job.status.in_(DUE), Job.run_at <= now)
+    kind = db.session.execute(select(Job.kind).where(*due).order_by(Job.run_at, Job.id).limit(1)).scalar()
+    if kind is None:
+        return []
+    ids = db.session.execute(select(Job.id).where(Job.kind == kind, *due)
+                             .order_by(Job.run_at, Job.id).limit(batch_size)).scalars().all()
+    lease = uuid.uuid4().hex
+    # Conditional on still being due, so two workers never hold the same job
+    db.session.execute(update(Job).where(Job.id.in_(ids), *due)
+                       .values(status='running', lease=lease, attempts=Job.attempts + 1,
+                               run_at=now + timedelta(seconds=visibility_timeout))
+                       .execution_options(synchronize_session=False))
+    jobs = db.session.execute(select(Job).where(Job.lease == lease).order_by(Job.id)).scalars().all()
+    # Past the last attempt only when a worker died holding the lease
+    for job in jobs:
+        if job.attempts > max_attempts:
+            job.status, job.lease, job.error = 'failed', None, 'visibility timeout expired'
+    db.session.commit()
+    return [job for job in jobs if job.status == 'running']
+
+
+def run_batch(jobs, max_attempts):
+    # Handlers may return cache namespaces to bump once their work is committed
+    kind, lease = jobs[0].kind, jobs[0].lease
+    try:
+        namespaces = TASKS[kind]([json.loads(job.payload) for job in jobs])
+        db.session.execute(delete(Job).where(Job.lease == lease))
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.exception('job batch %s (%d jobs) failed', kind, len(jobs))
+        now = datetime.now()
+        for job in jobs:
+            if job.attempts >= max_attempts:
+                job.status = 'failed'
+            else:
+                job.status = 'queued'
+                job.run_at = now + timedelta(seconds=2 ** job.attempts)
+            job.lease = None
+            job.error = repr(e)
+        db.session.commit()
+        metrics.jobs_total.inc(kind, 'error', amount=len(jobs))
+        return False
+    if namespaces:
+        cache.bump(*namespaces)
+    metrics.jobs_total.inc(kind, 'done', amount=len(jobs))
+    return True
+
+
+def run_pending():
+    # Runs due jobs until none are left; returns how many were claimed
+    config = current_app.config
+    processed = 0
+    while True:
+        jobs = claim(config['JOB_BATCH_SIZE'], config['JOB_VISIBILITY_TIMEOUT'], config['JOB_MAX_ATTEMPTS'])
+        if not jobs:
+            return processed
+        run_batch(jobs, config['JOB_MAX_ATTEMPTS'])
+        processed += len(jobs)
+
+
+def status_counts():
+    # {(kind, status): count}
+    rows = db.session.execute(select(Job.kind, Job.status, func.count()).group_by(Job.kind, Job.status))
+    return {(kind, status): count for kind, status, count in rows}
+
+
+def retry_failed():
+    count = db.session.execute(update(Job).where(Job.status == 'failed')
+                               .values(status='queued', attempts=0, run_at=datetime.now(), error=None)).rowcount
+    db.session.commit()
+    return count
+
+
+class JobQueue:
+    def __init__(self):
+        self.app = None
+        self.workers = 0
+        self._pid = None
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        self.workers = app.config['JOB_WORKERS']
+
+    def start(self):
+        # Once per process; a forked worker gets its own threads
+        if not self.workers or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            for i in range(self.workers):
+                threading.Thread(target=self.work, name=f'job-worker-{i}', daemon=True).start()
+
+    def wake(self):
+        self._wake.set()
+
+    def work(self):
+        interval = self.app.config['JOB_POLL_INTERVAL']
+        while True:
+            try:
+                with self.app.app_context():
+                    processed = run_pending()
+            except Exception:
+                # e.g. the database was locked for longer than busy_timeout
+                self.app.logger.exception('job worker error')
+                processed = 0
+            if not processed:
+                self._wake.wait(interval)
+                self._wake.clear()
+
+
+queue = JobQueue()
+
+
+@task('search')
+def _sync_search(payloads):
+    # One index refresh per kind for the whole batch
+    ids = defaultdict(set)
+    for payload in payloads:
+        ids[payload['entity']].update(payload['ids'])
+    for entity, entity_ids in ids.items():
+        search.sync(entity, sorted(entity_ids))
+    return ['search']
@@ -0,0 +1,177 @@
+import re
+import threading
+import time
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+
+# Per-request SQL and timing instrumentation. Engine listeners count the
+# statements and their time for the current request; the after_request hook
+# turns that into a Server-Timing header, logs slow requests and slow
+# statements, and records everything in the in-process histograms served at
+# /admin/metrics in the Prometheus text format. Like the cache stats, the
+# numbers are per worker process.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERY_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55)
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets, labels):
+        self.name = name
+        self.help = help_text
+        self.buckets = buckets
+        self.labels = labels
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0, 0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += 1
+            series[2] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for label_values, (counts, total, value_sum) in sorted(self._series.items()):
+                labels = ','.join(f'{k}="{v}"' for k, v in zip(self.labels, label_values))
+                for bound, count in zip(self.buckets, counts):
+                    lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {total}')
+                lines.append(f'{self.name}_sum{{{labels}}} {value_sum:.6f}')
+                lines.append(f'{self.name}_count{{{labels}}} {total}')
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                labels = ','.join(f'{k}="{v}"' for k, v in zip(self.labels, label_values))
+                lines.append(f'{self.name}{{{labels}}} {value}' if labels else f'{self.name} {value}')
+        return lines
+
+
+request_duration = Histogram('http_request_duration_seconds', 'Request latency by blueprint.',
+                             LATENCY_BUCKETS, ('blueprint',))
+request_queries = Histogram('http_request_sql_queries', 'SQL statements per request by blueprint.',
+                            QUERY_BUCKETS, ('blueprint',))
+sql_duration = Histogram('sql_query_duration_seconds', 'SQL statement latency by blueprint.',
+                         LATENCY_BUCKETS, ('blueprint',))
+requests_total = Counter('http_requests_total', 'Requests by blueprint and status.', ('blueprint', 'status'))
+slow_requests = Counter('slow_requests_total', 'Requests slower than SLOW_REQUEST_MS.', ('blueprint',))
+slow_queries = Counter('slow_queries_total', 'SQL statements slower than SLOW_QUERY_MS.', ('blueprint',))
+queries_by_target = Counter('sql_queries_total', 'SQL statements by database.', ('target',))
+jobs_total = Counter('background_jobs_total', 'Background jobs by kind and outcome.', ('kind', 'outcome'))
+rate_limited = Counter('rate_limited_requests_total', 'Requests refused by a rate limit bucket.',
+                       ('route_class', 'key'))
+shed_requests = Counter('shed_requests_total', 'Requests refused at the concurrency cap.', ('route_class',))
+REGISTRY = [request_duration, request_queries, sql_duration, requests_total, slow_requests, slow_queries,
+            queries_by_target, jobs_total, rate_limited, shed_requests]
+
+
+def normalize_sql(statement):
+    # One line, with IN lists collapsed, so the same query always logs the same way
+    statement = ' '.join(statement.split())
+    return re.sub(r'\((?:\?|%\(\w+\)s)(?:, (?:\?|%\(\w+\)s))+\)', '(...)', statement)
+
+
+def _blueprint():
+    return request.blueprint or ('static' if request.endpoint == 'static' else 'app')
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_start'].pop()
+    if not has_request_context():
+        return
+    g.sql_count = g.get('sql_count', 0) + 1
+    g.sql_time = g.get('sql_time', 0.0) + elapsed
+    blueprint = _blueprint()
+    sql_duration.observe(elapsed, blueprint)
+    if elapsed * 1000 >= current_app.config['SLOW_QUERY_MS']:
+        slow_queries.inc(blueprint)
+        current_app.logger.warning('slow query %.1f ms in %s: %s', elapsed * 1000,
+                                   request.endpoint, normalize_sql(statement))
+
+
+def _handle_error(context):
+    # A failed statement never reaches after_cursor_execute
+    if context.connection is not None and context.connection.info.get('query_start'):
+        context.connection.info['query_start'].pop()
+
+
+def _start_timer():
+    g.request_start = time.perf_counter()
+
+
+def _record(response):
+    start = g.get('request_start')
+    if start is None:
+        return response
+    elapsed = time.perf_counter() - start
+    count, sql_time = g.get('sql_count', 0), g.get('sql_time', 0.0)
+    blueprint = _blueprint()
+    request_duration.observe(elapsed, blueprint)
+    request_queries.observe(count, blueprint)
+    requests_total.inc(blueprint, response.status_code)
+
+    if current_app.config['SERVER_TIMING']:
+        response.headers['Server-Timing'] = (f'db;dur={sql_time * 1000:.1f};desc="{count} queries", '
+                                             f'app;dur={elapsed * 1000:.1f}')
+    if elapsed * 1000 >= current_app.config['SLOW_REQUEST_MS']:
+        slow_requests.inc(blueprint)
+        current_app.logger.warning('slow request %.1f ms: %s %s (%s), %d queries, %.1f ms SQL',
+                                   elapsed * 1000, request.method, request.full_path,
+                                   request.endpoint, count, sql_time * 1000)
+    return response
+
+
+def render():
+    from .cache import cache
+
+    lines = []
+    for metric in REGISTRY:
+        lines += metric.render()
+    stats = cache.stats()
+    for name in ('hits', 'misses'):
+        lines += [f'# HELP cache_{name}_total Response/fragment cache {name}.',
+                  f'# TYPE cache_{name}_total counter', f'cache_{name}_total {stats[name]}']
+    return '\n'.join(lines) + '\n'
+
+
+def instrument(engine, target='primary'):
+    # target labels sql_queries_total: primary or replica
+    def count(conn, cursor, statement, parameters, context, executemany):
+        queries_by_target.inc(target)
+
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', count)
+    event.listen(engine, 'handle_error', _handle_error)
+
+
+def init_app(app, engine):
+    instrument(engine)
+    app.before_request(_start_timer)
+    app.after_request(_record)
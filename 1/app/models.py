@@ -1,6 +1,11 @@
+from flask import current_app
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy import delete, event, exists, func, insert, literal, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import make_transient_to_detached, query_expression, with_expression
 from . import db, login_manager
+from .cache import LRUCache
+from .passwords import hasher
 
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -11,54 +16,363 @@ class User(UserMixin, db.Model):
     created_at = db.Column(db.DateTime, default=db.func.now())
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hasher.hash(password)
     
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return hasher.verify(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        return hasher.needs_rehash(self.password_hash)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'username': self.username,
+            'email': self.email,
+            'role': self.role,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+        }
 
 class Club(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(120), nullable=False)
+    name = db.Column(db.String(120), nullable=False, index=True)
     description = db.Column(db.Text)
     image_url = db.Column(db.String(255))
-    president_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    president_id = db.Column(db.Integer, db.ForeignKey('user.id'), index=True)
     created_at = db.Column(db.DateTime, default=db.func.now())
     
-    members = db.relationship('User', secondary='club_members', backref='clubs')
+    # Dynamic so membership checks and counts run as queries instead of
+    # loading every member row; see has_member/add_member/remove_member
+    members = db.relationship('User', secondary='club_members', backref='clubs', lazy='dynamic')
     events = db.relationship('Event', backref='club', lazy=True)
 
+    # Kept in step with club_members by add_member/remove_member; see counters.py
+    member_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    # Filled in by Club.with_counts(); None when the club was loaded another way
+    event_count = query_expression()
+
+    @classmethod
+    def with_counts(cls, popular=False):
+        # Clubs plus their event counts in one statement, so listing templates
+        # don't lazy-load every event just to count them. The count is a
+        # correlated subquery answered from the club_id index, so a page of
+        # clubs only touches its own rows. popular=True orders by member count.
+        event_count = (select(func.count()).where(Event.club_id == cls.id)
+                       .correlate(cls).scalar_subquery())
+        query = cls.query.options(with_expression(cls.event_count, event_count))
+        if popular:
+            return query.order_by(cls.member_count.desc(), cls.id)
+        return query.order_by(cls.id)
+
+    def has_member(self, user):
+        return _has_row(club_members, user_id=user.id, club_id=self.id)
+
+    def add_member(self, user):
+        # True if the user was added, False if already a member
+        added = _insert_ignore(club_members, user_id=user.id, club_id=self.id)
+        if added:
+            _bump(Club, self.id, 'member_count', 1)
+        return added
+
+    def remove_member(self, user):
+        # True if the user was removed, False if not a member
+        removed = _delete_row(club_members, user_id=user.id, club_id=self.id)
+        if removed:
+            _bump(Club, self.id, 'member_count', -1)
+        return removed
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'description': self.description,
+            'image_url': self.image_url,
+            'president_id': self.president_id,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'event_count': self.event_count,
+            'member_count': self.member_count,
+        }
+
 class Event(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(120), nullable=False)
     description = db.Column(db.Text)
-    date = db.Column(db.DateTime, nullable=False)
+    date = db.Column(db.DateTime, nullable=False, index=True)
     location = db.Column(db.String(200))
     club_id = db.Column(db.Integer, db.ForeignKey('club.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=db.func.now())
     image_url = db.Column(db.String(255))
+    # Seats; None means unlimited. Joins beyond it go to event_waitlist.
+    capacity = db.Column(db.Integer)
+
+    # Club pages filter on club_id and order by date; also serves club_id lookups
+    __table_args__ = (db.Index('ix_event_club_id_date', 'club_id', 'date'),)
     
-    attendees = db.relationship('User', secondary='event_attendees', backref='events')
+    attendees = db.relationship('User', secondary='event_attendees', backref='events', lazy='dynamic')
+
+    # Kept in step with event_attendees by join/leave
+    attendee_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    def has_attendee(self, user):
+        return _has_row(event_attendees, user_id=user.id, event_id=self.id)
+
+    def join(self, user):
+        # 'joined', 'waitlisted', or 'attending' / 'waiting' if the user already
+        # was. The seat is taken with a conditional UPDATE on the event row, so
+        # concurrent joins can't push attendee_count past capacity, and nothing
+        # loads the attendee list.
+        if not _insert_ignore(event_attendees, user_id=user.id, event_id=self.id):
+            return 'attending'
+        if _take_seat(self.id):
+            if self.capacity is not None:
+                _delete_row(event_waitlist, user_id=user.id, event_id=self.id)
+            return 'joined'
+        # Full: give the row back and queue up instead
+        _delete_row(event_attendees, user_id=user.id, event_id=self.id)
+        if _insert_ignore(event_waitlist, user_id=user.id, event_id=self.id):
+            return 'waitlisted'
+        return 'waiting'
+
+    def leave(self, user):
+        # 'left', 'unwaitlisted' or None if the user was neither attending nor
+        # waiting. A freed seat goes to the head of the waitlist in the same
+        # transaction.
+        if _delete_row(event_attendees, user_id=user.id, event_id=self.id):
+            _bump(Event, self.id, 'attendee_count', -1)
+            if self.capacity is not None:
+                _promote(self.id)
+            return 'left'
+        if _delete_row(event_waitlist, user_id=user.id, event_id=self.id):
+            return 'unwaitlisted'
+        return None
+
+    def waitlist_count(self):
+        return db.session.query(func.count()).filter(event_waitlist.c.event_id == self.id).scalar()
+
+    def waitlist_position(self, user):
+        # 1-based place in the queue, or None when the user isn't waiting
+        mine = (select(event_waitlist.c.id)
+                .where(event_waitlist.c.event_id == self.id, event_waitlist.c.user_id == user.id)
+                .scalar_subquery())
+        position = db.session.query(func.count()).filter(event_waitlist.c.event_id == self.id,
+                                                          event_waitlist.c.id <= mine).scalar()
+        return position or None
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'description': self.description,
+            'date': self.date.isoformat(),
+            'location': self.location,
+            'club_id': self.club_id,
+            'image_url': self.image_url,
+            'capacity': self.capacity,
+            'attendee_count': self.attendee_count,
+        }
 
 class ClubRequest(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     name = db.Column(db.String(120), nullable=False)
     description = db.Column(db.Text)
     status = db.Column(db.String(20), default='pending') # pending, approved, rejected
     created_at = db.Column(db.DateTime, default=db.func.now())
+
+    # The admin list filters on status and pages by id
+    __table_args__ = (db.Index('ix_club_request_status_id', 'status', 'id'),)
     
     user = db.relationship('User', backref='club_requests')
 
+    @classmethod
+    def moderate(cls, ids, action):
+        # Approves or rejects many pending requests in the caller's transaction:
+        # one SELECT to find which ids are still pending, one conditional
+        # UPDATE ... WHERE id IN for their status and, when approving, one
+        # batched INSERT for the clubs. Returns (handled ids, new club ids);
+        # raises ValueError if another admin handled some of them meanwhile.
+        status = {'approve': 'approved', 'reject': 'rejected'}[action]
+        pending = db.session.execute(
+            select(cls.id, cls.user_id, cls.name, cls.description)
+            .where(cls.id.in_(ids), cls.status == 'pending').order_by(cls.id)).all()
+        if not pending:
+            return [], []
+        handled = [row.id for row in pending]
+        updated = db.session.execute(update(cls).where(cls.id.in_(handled), cls.status == 'pending')
+                                     .values(status=status)
+                                     .execution_options(synchronize_session=False)).rowcount
+        if updated != len(handled):
+            raise ValueError('Bazı istekler aynı anda başka bir yönetici tarafından işlendi.')
+        club_ids = []
+        if action == 'approve':
+            # Only the set of new ids is needed, so RETURNING may come back in
+            # any order and the rows go out as one multi-row INSERT
+            club_ids = sorted(db.session.execute(
+                insert(Club).returning(Club.id),
+                [{'name': row.name, 'description': row.description, 'president_id': row.user_id}
+                 for row in pending]).scalars().all())
+        return handled, club_ids
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'name': self.name,
+            'description': self.description,
+            'status': self.status,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+        }
+
+class Job(db.Model):
+    # Background work queued by requests; see jobs.py
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text, nullable=False)  # JSON
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    # When a queued job is due, or when a running job's lease runs out
+    run_at = db.Column(db.DateTime, nullable=False)
+    lease = db.Column(db.String(32), index=True)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=db.func.now())
+
+    # Workers look for due jobs by status and run_at
+    __table_args__ = (db.Index('ix_job_status_run_at', 'status', 'run_at'),)
+
+# The primary keys lead with user_id ("clubs of user X"); the reverse
+# indexes serve "members of club X" lookups and per-club counts
 club_members = db.Table('club_members',
     db.Column('user_id', db.Integer, db.ForeignKey('user.id'), primary_key=True),
-    db.Column('club_id', db.Integer, db.ForeignKey('club.id'), primary_key=True)
+    db.Column('club_id', db.Integer, db.ForeignKey('club.id'), primary_key=True),
+    db.Index('ix_club_members_club_id_user_id', 'club_id', 'user_id')
 )
 
 event_attendees = db.Table('event_attendees',
     db.Column('user_id', db.Integer, db.ForeignKey('user.id'), primary_key=True),
-    db.Column('event_id', db.Integer, db.ForeignKey('event.id'), primary_key=True)
+    db.Column('event_id', db.Integer, db.ForeignKey('event.id'), primary_key=True),
+    db.Index('ix_event_attendees_event_id_user_id', 'event_id', 'user_id')
 )
 
+# Queue for full events; the id orders it, first come first served
+event_waitlist = db.Table('event_waitlist',
+    db.Column('id', db.Integer, primary_key=True),
+    db.Column('event_id', db.Integer, db.ForeignKey('event.id'), nullable=False),
+    db.Column('user_id', db.Integer, db.ForeignKey('user.id'), nullable=False),
+    db.UniqueConstraint('event_id', 'user_id', name='uq_event_waitlist_event_id_user_id'),
+    db.Index('ix_event_waitlist_event_id_id', 'event_id', 'id')
+)
+
+
+def _where(table, values):
+    return [table.c[name] == value for name, value in values.items()]
+
+
+def _has_row(table, **values):
+    return db.session.query(exists().where(*_where(table, values))).scalar()
+
+
+def insert_ignore(table):
+    # INSERT that skips rows hitting a primary/unique key, also for executemany.
+    # None on databases without ON CONFLICT support.
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        return postgresql.insert(table).on_conflict_do_nothing()
+    if dialect == 'sqlite':
+        return sqlite.insert(table).on_conflict_do_nothing()
+    return None
+
+
+def _insert_ignore(table, **values):
+    # Single-statement idempotent insert: a double click or a concurrent
+    # request hitting the primary key is a no-op instead of an IntegrityError
+    stmt = insert_ignore(table)
+    if stmt is not None:
+        stmt = stmt.values(**values)
+    else:
+        missing = select(*[literal(v).label(k) for k, v in values.items()]) \
+            .where(~exists().where(*_where(table, values)))
+        stmt = insert(table).from_select(list(values), missing)
+    return db.session.execute(stmt).rowcount == 1
+
+
+def _delete_row(table, **values):
+    return db.session.execute(delete(table).where(*_where(table, values))).rowcount == 1
+
+
+def _bump(model, row_id, column, delta):
+    # Relative UPDATE in the caller's transaction, so concurrent joins can't
+    # overwrite each other's increments; also updates the loaded instance
+    counter = getattr(model, column)
+    db.session.execute(update(model).where(model.id == row_id).values({column: counter + delta}))
+
+
+def _take_seat(event_id):
+    # Conditional increment: matches no row once the event is full. On
+    # Postgres it also locks the event row until commit, which serializes
+    # joins and promotions for one event; SQLite has a single writer anyway.
+    stmt = (update(Event)
+            .where(Event.id == event_id,
+                   or_(Event.capacity.is_(None), Event.attendee_count < Event.capacity))
+            .values(attendee_count=Event.attendee_count + 1)
+            .execution_options(synchronize_session=False))
+    return db.session.execute(stmt).rowcount == 1
+
+
+def _pop_waitlist(event_id):
+    # Removes and returns the first waiting user id, or None
+    while True:
+        head = db.session.execute(select(event_waitlist.c.id, event_waitlist.c.user_id)
+                                  .where(event_waitlist.c.event_id == event_id)
+                                  .order_by(event_waitlist.c.id).limit(1)).first()
+        if head is None:
+            return None
+        # Lost the row to someone leaving the waitlist concurrently: try the next one
+        if _delete_row(event_waitlist, id=head.id):
+            return head.user_id
+
+
+def _promote(event_id):
+    # Fills free seats from the waitlist; returns the promoted user ids
+    promoted = []
+    while _take_seat(event_id):
+        user_id = _pop_waitlist(event_id)
+        if user_id is None:
+            _bump(Event, event_id, 'attendee_count', -1)
+            break
+        if _insert_ignore(event_attendees, user_id=user_id, event_id=event_id):
+            promoted.append(user_id)
+        else:
+            _bump(Event, event_id, 'attendee_count', -1)
+    return promoted
+
+
+# Identity columns kept per process for the user loader. The password hash is
+# left out on purpose; it is lazy-loaded on the rare request that needs it.
+USER_CACHE_COLUMNS = ('id', 'username', 'email', 'role', 'created_at')
+user_cache = LRUCache(max_entries=4096)
+
+
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    ttl = current_app.config.get('USER_CACHE_TTL', 60)
+    data = user_cache.get(user_id) if ttl else None
+    if data is None:
+        user = db.session.get(User, int(user_id))
+        if user is not None and ttl:
+            user_cache.set(user_id, {c: getattr(user, c) for c in USER_CACHE_COLUMNS}, ttl)
+        return user
+
+    # Rebuild the user as a detached, already-loaded instance and attach it
+    # to this request's session without a SELECT
+    user = User(**data)
+    make_transient_to_detached(user)
+    return db.session.merge(user, load=False)
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _invalidate_cached_user(mapper, connection, target):
+    # Role, password or profile changes made through the ORM drop the entry;
+    # changes from other processes or bulk UPDATEs are bounded by the TTL
+    user_cache.delete(str(target.id))
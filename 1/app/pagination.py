@@ -0,0 +1,113 @@
+import base64
+import datetime
+import json
+
+from flask import abort, current_app, request, url_for
+from sqlalchemy import literal, tuple_
+
+
+class KeysetPage:
+    def __init__(self, items, next_cursor, per_page):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.per_page = per_page
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def to_dict(self):
+        return {
+            'items': [item.to_dict() for item in self.items],
+            'next_cursor': self.next_cursor,
+            'per_page': self.per_page,
+        }
+
+
+def _dump(value):
+    if isinstance(value, datetime.datetime):
+        return {'dt': value.isoformat()}
+    return value
+
+
+def _load(value):
+    if isinstance(value, dict) and 'dt' in value:
+        return datetime.datetime.fromisoformat(value['dt'])
+    return value
+
+
+def encode_cursor(values):
+    raw = json.dumps([_dump(v) for v in values], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token, keys):
+    # Malformed or tampered tokens are a client error, not a server error.
+    # Each value must have the exact python type of its key column (so no
+    # bools for ints, no nested lists or objects).
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = [_load(v) for v in json.loads(raw)]
+    except (ValueError, TypeError):
+        abort(400)
+    if len(values) != len(keys):
+        abort(400)
+    for key, value in zip(keys, values):
+        if type(value) is not key.type.python_type:
+            abort(400)
+    return values
+
+
+def wants_json():
+    # ?format=json, or an Accept header that prefers JSON over HTML
+    if request.args.get('format') == 'json':
+        return True
+    return request.accept_mimetypes.best_match(['text/html', 'application/json']) == 'application/json'
+
+
+def page_size():
+    default = current_app.config.get('PAGE_SIZE', 20)
+    maximum = current_app.config.get('PAGE_SIZE_MAX', 100)
+    per_page = request.args.get('per_page', default, type=int)
+    return max(1, min(per_page, maximum))
+
+
+def keyset_paginate(query, keys, per_page=None):
+    # Seek pagination over an ascending key (e.g. [Model.id] or [Model.date, Model.id]).
+    # The last key must be unique so every row has exactly one position.
+    # Cost stays flat however deep the page is, unlike OFFSET.
+    per_page = per_page or page_size()
+    token = request.args.get('cursor')
+    if token:
+        after = decode_cursor(token, keys)
+        if len(keys) == 1:
+            query = query.filter(keys[0] > after[0])
+        else:
+            # Typed literals so e.g. datetimes bind in the column's storage format
+            bounds = [literal(v, type_=key.type) for key, v in zip(keys, after)]
+            query = query.filter(tuple_(*keys) > tuple_(*bounds))
+
+    rows = query.order_by(None).order_by(*keys).limit(per_page + 1).all()
+    items = rows[:per_page]
+    next_cursor = None
+    if len(rows) > per_page:
+        last = items[-1]
+        next_cursor = encode_cursor([getattr(last, key.key) for key in keys])
+    return KeysetPage(items, next_cursor, per_page)
+
+
+def page_url(cursor=None):
+    # Current URL with the cursor swapped out; other filters and per_page are kept
+    # Every value of repeated filters (?club=1&club=2) is kept
+    args = request.args.copy()
+    args.poplist('cursor')
+    if cursor:
+        args['cursor'] = cursor
+    # View arguments win over query parameters of the same name (?club_id=)
+    return url_for(request.endpoint, **{**args.to_dict(flat=False), **request.view_args})
@@ -0,0 +1,69 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+def _hash(password, method):
+    if method:
+        return generate_password_hash(password, method=method)
+    return generate_password_hash(password)
+
+
+class PasswordHasher:
+    # Runs password hashing on a bounded pool. hashlib releases the GIL while
+    # hashing, so a thread pool uses several cores, and its size caps how many
+    # hashes run at once however many requests arrive together.
+    # PASSWORD_HASH_POOL=process switches to worker processes instead.
+
+    def __init__(self):
+        self.method = None
+        self.max_workers = os.cpu_count() or 1
+        self.pool_type = 'thread'
+        self._executor = None
+        self._canonical_method = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        # Werkzeug method string, e.g. 'scrypt:32768:8:1' or 'pbkdf2:sha256:600000';
+        # empty means Werkzeug's default
+        self.method = app.config.get('PASSWORD_HASH_METHOD') or None
+        self.max_workers = app.config.get('PASSWORD_HASH_WORKERS') or os.cpu_count() or 1
+        self.pool_type = app.config.get('PASSWORD_HASH_POOL', 'thread')
+        self._canonical_method = None
+        self.shutdown()
+
+    @property
+    def executor(self):
+        # Created on first use so every gunicorn worker gets its own pool after fork
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    pool = ProcessPoolExecutor if self.pool_type == 'process' else ThreadPoolExecutor
+                    self._executor = pool(max_workers=self.max_workers)
+        return self._executor
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def hash(self, password):
+        return self.executor.submit(_hash, password, self.method).result()
+
+    def hash_many(self, passwords):
+        return list(self.executor.map(_hash, passwords, [self.method] * len(passwords)))
+
+    def verify(self, pwhash, password):
+        return self.executor.submit(check_password_hash, pwhash, password).result()
+
+    def needs_rehash(self, pwhash):
+        # True when the stored hash was made with other parameters than the
+        # configured ones; the method prefix is everything before the first '$'
+        if self._canonical_method is None:
+            self._canonical_method = self.hash('probe').split('$', 1)[0]
+        return pwhash.split('$', 1)[0] != self._canonical_method
+
+
+hasher = PasswordHasher()
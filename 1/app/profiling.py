@@ -0,0 +1,130 @@
+import cProfile
+import io
+import os
+import pstats
+import random
+import sys
+import threading
+from collections import Counter
+
+from flask import current_app, g, request
+from flask_login import current_user
+
+# Opt-in request profiling that can be switched on in a running worker.
+#
+#   ?__profile=1        (admins) sample this request's stack
+#   ?__profile=cprofile (admins) run cProfile and return its report instead of the page
+#   PROFILE_SAMPLE_RATE  sample that fraction of all requests (changeable at
+#                        runtime through POST /admin/profile?rate=0.05)
+#
+# Sampled stacks are aggregated across requests per worker process and served
+# by /admin/profile in the collapsed "frame;frame;frame count" format that
+# flamegraph.pl and speedscope read.
+MAX_STACK_DEPTH = 200
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    module = frame.f_globals.get('__name__')
+    if not module or module.startswith('<') or module == '__main__':
+        # Compiled Jinja templates have no module; their file is the template
+        module = os.path.basename(code.co_filename)
+    return f'{module}:{code.co_name}'
+
+
+def collapse(frame, root):
+    # Stops at Flask's WSGI entry point, so server frames (gunicorn, werkzeug)
+    # don't prefix every stack; the endpoint name is the root instead
+    names = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        name = _frame_name(frame)
+        if name == 'flask.app:wsgi_app':
+            break
+        names.append(name)
+        frame = frame.f_back
+    names.append(root)
+    return ';'.join(reversed(names))
+
+
+class StackSampler:
+    def __init__(self):
+        self.rate = 0.0
+        self.interval = 0.005
+        self.stacks = Counter()
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.rate = app.config.get('PROFILE_SAMPLE_RATE', 0.0)
+        self.interval = app.config.get('PROFILE_INTERVAL_MS', 5) / 1000
+
+    def start(self, root):
+        # Samples the calling thread from a helper thread until the returned event is set
+        stop = threading.Event()
+        target = threading.get_ident()
+        thread = threading.Thread(target=self._sample, args=(target, root, stop), daemon=True)
+        thread.start()
+        return stop, thread
+
+    def _sample(self, target, root, stop):
+        local = Counter()
+        while not stop.wait(self.interval):
+            frame = sys._current_frames().get(target)
+            if frame is not None:
+                local[collapse(frame, root)] += 1
+        with self._lock:
+            self.stacks.update(local)
+            self.requests += 1
+
+    def collapsed(self):
+        with self._lock:
+            return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+    def reset(self):
+        with self._lock:
+            self.stacks.clear()
+            self.requests = 0
+
+
+sampler = StackSampler()
+
+
+def _is_admin():
+    return current_user.is_authenticated and current_user.role == 'admin'
+
+
+def _start():
+    mode = request.args.get('__profile')
+    if mode and _is_admin():
+        if mode == 'cprofile':
+            g.cprofile = cProfile.Profile()
+            g.cprofile.enable()
+            return
+    elif not (sampler.rate and random.random() < sampler.rate):
+        return
+    g.profile_sampler = sampler.start(request.endpoint or request.path)
+
+
+def _cprofile_report(response):
+    profile = g.pop('cprofile', None)
+    if profile is None:
+        return response
+    profile.disable()
+    out = io.StringIO()
+    pstats.Stats(profile, stream=out).sort_stats('cumulative').print_stats(60)
+    return current_app.response_class(out.getvalue(), mimetype='text/plain')
+
+
+def _stop(exc):
+    handle = g.pop('profile_sampler', None)
+    if handle is not None:
+        stop, thread = handle
+        stop.set()
+        thread.join()
+
+
+def init_app(app):
+    sampler.init_app(app)
+    app.before_request(_start)
+    app.after_request(_cprofile_report)
+    app.teardown_request(_stop)
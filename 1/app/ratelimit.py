@@ -0,0 +1,204 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, request
+from flask_login import current_user
+from werkzeug.exceptions import TooManyRequests
+
+from . import metrics
+
+# Admission control for the expensive endpoints: login/register hash a
+# password, join/leave take the database write lock. Views decorated with
+# @limit('<route class>') pass two checks before they run:
+#
+# * token buckets per client IP and per user (the submitted username on the
+#   auth forms, the logged-in user elsewhere). A bucket holds `count` tokens
+#   and refills at count/period, so short bursts pass and a steady flood is
+#   turned away. Buckets live in process memory by default; with
+#   RATELIMIT_STORAGE=redis all workers share them.
+# * a cap on how many requests of the class run at once in this process.
+#   Past the cap a request is answered right away instead of waiting for a
+#   thread, so a burst of logins can't tie up every worker thread.
+#
+# Both answer 429 with a Retry-After header and are counted in /admin/metrics.
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600}
+SHED_RETRY_AFTER = 1
+TOO_MANY = 'Çok fazla istek gönderildi. Lütfen biraz bekleyip tekrar deneyin.'
+
+
+def parse_rate(value):
+    # '10/minute' -> (tokens per second, bucket size); empty or '0' -> None
+    if not value or value.strip() == '0':
+        return None
+    count, _, period = value.strip().partition('/')
+    count = int(count)
+    return count / PERIODS[period.strip() or 'second'], count
+
+
+def _gcra(tat, now, rate, burst):
+    # Token bucket kept as one timestamp: the time at which the bucket would
+    # be full again (the "theoretical arrival time"). Returns (new tat, 0) when
+    # a token is available, else (None, seconds until one is).
+    interval = 1.0 / rate
+    tat = max(tat or now, now)
+    wait = tat - now - (burst - 1) * interval
+    if wait > 0:
+        return None, wait
+    return tat + interval, 0.0
+
+
+class RateLimitStore:
+    # Interface for bucket storage. take() spends one token from the bucket
+    # `key` (refilling at `rate` tokens/second, holding at most `burst`) and
+    # returns 0 when it could, else the seconds until a token is available.
+
+    def take(self, key, rate, burst):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class MemoryStore(RateLimitStore):
+    # Per-process buckets. At most max_keys are kept; the least recently used
+    # are forgotten first, which only ever hands a client a full bucket.
+
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, burst):
+        now = time.monotonic()
+        with self._lock:
+            tat, wait = _gcra(self._buckets.get(key), now, rate, burst)
+            if tat is not None:
+                self._buckets[key] = tat
+                self._buckets.move_to_end(key)
+                while len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            return wait
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class RedisStore(RateLimitStore):
+    # Buckets shared by every worker. Wraps any client with the redis-py
+    # get/set/pipeline API, so a real Redis or a local stand-in (e.g.
+    # fakeredis) works. The read-modify-write runs under WATCH and is retried
+    # if another worker changed the bucket in between.
+
+    def __init__(self, client, prefix='cms:rl:'):
+        from redis.exceptions import WatchError
+        self.client = client
+        self.prefix = prefix
+        self._conflict = WatchError
+
+    def take(self, key, rate, burst):
+        key = self.prefix + key
+        with self.client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(key)
+                    now = time.time()
+                    raw = pipe.get(key)
+                    tat, wait = _gcra(float(raw) if raw else None, now, rate, burst)
+                    if tat is None:
+                        pipe.unwatch()
+                        return wait
+                    pipe.multi()
+                    # Expires once the bucket is full again
+                    pipe.set(key, repr(tat), px=max(1, math.ceil((tat - now) * 1000)))
+                    pipe.execute()
+                    return 0.0
+                except self._conflict:
+                    continue
+
+    def clear(self):
+        keys = list(self.client.scan_iter(self.prefix + '*'))
+        if keys:
+            self.client.delete(*keys)
+
+
+class RateLimiter:
+    def __init__(self):
+        self.enabled = False
+        self.store = MemoryStore()
+        self.limits = {}
+        self.slots = {}
+
+    def init_app(self, app):
+        config = app.config
+        self.enabled = config['RATELIMIT_ENABLED']
+        if config['RATELIMIT_STORAGE'] == 'redis':
+            import redis
+            client = redis.Redis.from_url(config['RATELIMIT_REDIS_URL'] or config['CACHE_REDIS_URL'])
+            self.store = RedisStore(client)
+        else:
+            self.store = MemoryStore(config['RATELIMIT_MAX_KEYS'])
+        # {route class: {'ip': (rate, burst) or None, 'user': ...}}
+        self.limits = {name: {key: parse_rate(value) for key, value in keys.items()}
+                       for name, keys in config['RATE_LIMITS'].items()}
+        self.slots = {name: threading.BoundedSemaphore(cap)
+                      for name, cap in config['CONCURRENCY_LIMITS'].items() if cap}
+
+    def check(self, route_class, keys):
+        # Spends a token per key; returns the seconds to wait for the first
+        # exhausted bucket, or 0. A store that is down lets requests through.
+        for key_type, key in keys:
+            limit = self.limits.get(route_class, {}).get(key_type)
+            if limit is None or key is None:
+                continue
+            try:
+                wait = self.store.take(f'{route_class}:{key_type}:{key}', *limit)
+            except Exception:
+                current_app.logger.exception('rate limit store error')
+                return 0.0
+            if wait:
+                metrics.rate_limited.inc(route_class, key_type)
+                return wait
+        return 0.0
+
+    def clear(self):
+        self.store.clear()
+
+
+limiter = RateLimiter()
+
+
+def _user_key():
+    if current_user.is_authenticated:
+        return current_user.get_id()
+    # Auth forms: the account being logged into or registered
+    username = request.form.get('username', '').strip().lower()
+    return username or None
+
+
+def limit(route_class, methods=None):
+    # methods: only these HTTP methods are limited, e.g. ('POST',) so the
+    # login form itself can always be shown
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not limiter.enabled or (methods and request.method not in methods):
+                return view(*args, **kwargs)
+            wait = limiter.check(route_class, (('ip', request.remote_addr), ('user', _user_key())))
+            if wait:
+                raise TooManyRequests(TOO_MANY, retry_after=math.ceil(wait))
+            slot = limiter.slots.get(route_class)
+            if slot is None:
+                return view(*args, **kwargs)
+            if not slot.acquire(blocking=False):
+                metrics.shed_requests.inc(route_class)
+                raise TooManyRequests(TOO_MANY, retry_after=SHED_RETRY_AFTER)
+            try:
+                return view(*args, **kwargs)
+            finally:
+                slot.release()
+        return wrapper
+    return decorator
@@ -0,0 +1,94 @@
+import random
+import sqlite3
+import time
+
+from flask import current_app, g, has_request_context, request, session as flask_session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+# Read/write splitting. DATABASE_REPLICA_URLS adds one bind per replica; views
+# marked @read_only run their SELECTs on one replica picked per request, and
+# everything else (writes, flushes, raw SQL, background jobs, CLI commands)
+# stays on the primary. A commit that wrote anything opens a
+# READ_YOUR_WRITES_SECONDS window in the user's session during which their
+# read-only pages also go to the primary, so a redirect after joining a club
+# doesn't show a replica that hasn't caught up yet. Page and fragment cache
+# entries are only ever filled from the primary (see cache.py), so replica lag
+# can't outlive the read that saw it.
+PRIMARY_UNTIL = '_primary_until'
+
+
+def replica_binds(urls, options):
+    # SQLALCHEMY_BINDS entries for a comma-separated list of replica URLs
+    binds = {}
+    for i, url in enumerate(u.strip() for u in urls.split(',') if u.strip()):
+        binds[f'replica{i + 1}'] = {'url': url, **options(url)}
+    return binds
+
+
+def read_only(view):
+    # Marks a view whose queries may be answered by a replica
+    view.read_only = True
+    return view
+
+
+def _is_read(clause):
+    # Only ORM/Core SELECTs; textual SQL may write and stays on the primary
+    return clause is not None and getattr(clause, 'is_select', False)
+
+
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            if self._flushing or getattr(clause, 'is_dml', False):
+                self.info['wrote'] = True
+            elif _is_read(clause) and has_request_context() and g.get('replica'):
+                return self._db.engines[g.replica]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _after_commit(session):
+    if session.info.pop('wrote', False) and has_request_context() and current_app.config['REPLICA_BINDS']:
+        flask_session[PRIMARY_UNTIL] = time.time() + current_app.config['READ_YOUR_WRITES_SECONDS']
+
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _after_rollback(session):
+    session.info.pop('wrote', None)
+
+
+def _choose_replica():
+    replicas = current_app.config['REPLICA_BINDS']
+    if not replicas:
+        return
+    view = current_app.view_functions.get(request.endpoint)
+    if getattr(view, 'read_only', False) and flask_session.get(PRIMARY_UNTIL, 0) < time.time():
+        g.replica = random.choice(replicas)
+
+
+def replicate(db):
+    # Stand-in for real replication when the databases are SQLite files:
+    # copies the primary into every replica with the online backup API.
+    # Returns the replica paths written.
+    written = []
+    source = db.engine.raw_connection()
+    try:
+        for key in current_app.config['REPLICA_BINDS']:
+            url = make_url(str(db.engines[key].url))
+            if url.get_backend_name() != 'sqlite' or db.engine.dialect.name != 'sqlite':
+                raise ValueError('flask replicate yalnızca SQLite veritabanları arasında kopyalar')
+            target = sqlite3.connect(url.database)
+            try:
+                source.driver_connection.backup(target)
+            finally:
+                target.close()
+            written.append(url.database)
+    finally:
+        source.close()
+    return written
+
+
+def init_app(app):
+    app.before_request(_choose_replica)
@@ -0,0 +1,43 @@
+import gzip
+
+from flask import current_app, request
+from flask_login import current_user
+
+# Conditional GET and compression for rendered pages. Every successful HTML or
+# JSON response gets a weak ETag, so a revalidating browser receives a bodiless
+# 304 when nothing changed, and bodies above COMPRESS_MIN_SIZE are gzipped.
+# Static files are left alone; they have their own headers and precompressed
+# copies (see assets.py).
+COMPRESSIBLE_MIMETYPES = ('text/html', 'application/json', 'text/plain', 'text/calendar')
+
+
+def finalize_response(response):
+    if (request.method not in ('GET', 'HEAD') or response.status_code != 200
+            or response.direct_passthrough or response.is_streamed
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    # Revalidate on every use; per-user pages must never sit in shared caches
+    if 'Cache-Control' not in response.headers:
+        authenticated = current_user.is_authenticated
+        response.headers['Cache-Control'] = 'private, no-cache' if authenticated else 'no-cache'
+
+    # Weak: the same ETag is valid for the gzip and identity encodings
+    response.add_etag(weak=True)
+    response.make_conditional(request)
+    if response.status_code == 304:
+        return response
+
+    response.vary.add('Accept-Encoding')
+    if 'gzip' not in request.accept_encodings or 'Content-Encoding' in response.headers:
+        return response
+    data = response.get_data()
+    if len(data) < current_app.config['COMPRESS_MIN_SIZE']:
+        return response
+    response.set_data(gzip.compress(data, compresslevel=current_app.config['COMPRESS_LEVEL']))
+    response.content_encoding = 'gzip'
+    return response
+
+
+def init_app(app):
+    app.after_request(finalize_response)
@@ -1,8 +1,17 @@
-from flask import Blueprint, render_template, redirect, url_for, request, flash
+from flask import Blueprint, render_template, redirect, url_for, request, flash, jsonify, abort, current_app
 from flask_login import login_user, logout_user, current_user, login_required
-from datetime import datetime
-from . import db
-from .models import User, Club, Event, ClubRequest
+from datetime import datetime, timedelta
+from sqlalchemy import delete, select
+from sqlalchemy.orm import joinedload
+from . import db, metrics, search
+from .jobs import enqueue
+from .cache import cache, cached_page, fill_from_primary
+from .ical import render_calendar
+from .models import User, Club, Event, ClubRequest, club_members, event_attendees, event_waitlist
+from .pagination import keyset_paginate, page_size, wants_json
+from .profiling import sampler
+from .ratelimit import limit
+from .replicas import read_only
 
 # Blueprints
 auth_bp = Blueprint('auth', __name__)
@@ -10,8 +19,21 @@ club_bp = Blueprint('club', __name__)
 event_bp = Blueprint('event', __name__)
 main_bp = Blueprint('main', __name__)
 
+# Detail pages list at most this many members/attendees; the counts stay exact
+MEMBER_LIST_LIMIT = 100
+
+# Club request moderation; the bulk endpoint takes at most this many ids per POST
+REQUEST_STATUSES = ('pending', 'approved', 'rejected')
+MODERATION_ACTIONS = ('approve', 'reject')
+BULK_MODERATION_MAX = 500
+
+# Calendar feeds are one document, not pages; club calendars keep a month of history
+CALENDAR_LIMIT = 500
+CALENDAR_HISTORY = timedelta(days=30)
+
 # Auth Routes
 @auth_bp.route('/register', methods=['GET', 'POST'])
+@limit('auth', methods=('POST',))
 def register():
     if request.method == 'POST':
         username = request.form.get('username')
@@ -33,6 +55,7 @@ def register():
     return render_template('register.html')
 
 @auth_bp.route('/login', methods=['GET', 'POST'])
+@limit('auth', methods=('POST',))
 def login():
     if request.method == 'POST':
         username = request.form.get('username')
@@ -41,6 +64,10 @@ def login():
         user = User.query.filter_by(username=username).first()
         
         if user and user.check_password(password):
+            # Upgrade hashes made with older algorithm/cost settings
+            if user.password_needs_rehash():
+                user.set_password(password)
+                db.session.commit()
             login_user(user)
             return redirect(url_for('main.index'))
         
@@ -56,8 +83,10 @@ def logout():
 
 # Main Routes
 @main_bp.route('/')
+@read_only
+@cached_page('clubs')
 def index():
-    clubs = Club.query.all()
+    clubs = Club.with_counts(popular=True).all()
     return render_template('index.html', clubs=clubs)
 
 
@@ -77,13 +106,66 @@ def list_users():
         flash('Bu işlem için yönetici yetkisi gerekiyor.', 'danger')
         return redirect(url_for('main.index'))
     
-    users = User.query.all()
+    users = keyset_paginate(User.query, [User.id])
+    if wants_json():
+        return jsonify(users.to_dict())
     return render_template('admin_users.html', users=users)
 
+@main_bp.route('/admin/cache')
+@login_required
+def cache_stats():
+    if current_user.role != 'admin':
+        flash('Bu işlem için yönetici yetkisi gerekiyor.', 'danger')
+        return redirect(url_for('main.index'))
+    return jsonify(cache.stats())
+
+@main_bp.route('/search')
+@cached_page('clubs', 'events', 'search')
+def search_page():
+    query = request.args.get('q', '').strip()
+    kind = request.args.get('type')
+    kinds = (kind,) if kind in ('club', 'event') else ('club', 'event')
+    results = search.search(query, kinds, limit=page_size()) if query else {}
+    if wants_json():
+        return jsonify(query=query, **{f'{kind}s': [row.to_dict() for row in rows]
+                                       for kind, rows in results.items()})
+    return render_template('search.html', query=query, kind=kind,
+                           clubs=results.get('club', []), events=results.get('event', []))
+
+@main_bp.route('/admin/metrics')
+def metrics_view():
+    # Prometheus text format; scrapers authenticate with METRICS_TOKEN
+    token = current_app.config['METRICS_TOKEN']
+    if not (token and request.headers.get('Authorization') == f'Bearer {token}'):
+        if not current_user.is_authenticated or current_user.role != 'admin':
+            abort(403)
+    return current_app.response_class(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@main_bp.route('/admin/profile', methods=['GET', 'POST'])
+@login_required
+def profile_view():
+    # Collapsed stacks for flamegraph.pl / speedscope. POST ?rate=0.05 changes
+    # the sampled share of requests, POST ?reset=1 starts a new aggregate.
+    if current_user.role != 'admin':
+        abort(403)
+    if request.method == 'POST':
+        if 'rate' in request.args:
+            sampler.rate = max(0.0, min(request.args.get('rate', 0.0, type=float), 1.0))
+        if request.args.get('reset'):
+            sampler.reset()
+    response = current_app.response_class(sampler.collapsed(), mimetype='text/plain')
+    response.headers['X-Profile-Requests'] = str(sampler.requests)
+    response.headers['X-Profile-Rate'] = str(sampler.rate)
+    return response
+
 # Club Routes
 @club_bp.route('/clubs')
+@read_only
+@cached_page('clubs')
 def list_clubs():
-    clubs = Club.query.all()
+    clubs = keyset_paginate(Club.with_counts(), [Club.id])
+    if wants_json():
+        return jsonify(clubs.to_dict())
     return render_template('clubs.html', clubs=clubs)
 
 @club_bp.route('/club/create', methods=['GET', 'POST'])
@@ -96,7 +178,10 @@ def create_club():
         if current_user.role == 'admin':
             club = Club(name=name, description=description, president_id=current_user.id)
             db.session.add(club)
+            db.session.flush()
+            enqueue('search', entity='club', ids=[club.id])
             db.session.commit()
+            cache.bump('clubs')
             flash('Kulüp başarıyla oluşturuldu!', 'success')
         else:
             club_req = ClubRequest(name=name, description=description, user_id=current_user.id)
@@ -114,44 +199,116 @@ def list_requests():
     if current_user.role != 'admin':
         flash('Yetkisiz erişim.', 'danger')
         return redirect(url_for('main.index'))
-    
-    requests = ClubRequest.query.filter_by(status='pending').all()
-    return render_template('admin_requests.html', requests=requests)
+
+    status = request.args.get('status', 'pending')
+    if status not in REQUEST_STATUSES:
+        abort(400)
+    query = ClubRequest.query.filter_by(status=status).options(joinedload(ClubRequest.user))
+    name = request.args.get('q', '').strip()
+    if name:
+        query = query.filter(ClubRequest.name.icontains(name, autoescape=True))
+    username = request.args.get('user', '').strip()
+    if username:
+        query = query.filter(ClubRequest.user_id == select(User.id).where(User.username == username)
+                             .scalar_subquery())
+    requests = keyset_paginate(query, [ClubRequest.id])
+    if wants_json():
+        return jsonify(requests.to_dict())
+    return render_template('admin_requests.html', requests=requests, status=status,
+                           query=name, username=username)
+
+def _moderate(ids, action):
+    # Shared by the single and bulk endpoints: one transaction, one commit.
+    # Returns (handled ids, new club ids), or None on a concurrent conflict.
+    try:
+        handled, club_ids = ClubRequest.moderate(ids, action)
+    except ValueError as e:
+        db.session.rollback()
+        flash(str(e), 'danger')
+        return None
+    if club_ids:
+        enqueue('search', entity='club', ids=club_ids)
+    db.session.commit()
+    if club_ids:
+        cache.bump('clubs')
+    return handled, club_ids
 
 @club_bp.route('/admin/request/<int:req_id>/<action>')
 @login_required
 def handle_request(req_id, action):
     if current_user.role != 'admin':
         return redirect(url_for('main.index'))
-        
+
     req = ClubRequest.query.get_or_404(req_id)
-    
-    if action == 'approve':
-        req.status = 'approved'
-        # Create the club
-        club = Club(name=req.name, description=req.description, president_id=req.user_id)
-        db.session.add(club)
+    if action not in MODERATION_ACTIONS:
+        abort(404)
+    result = _moderate([req.id], action)
+    if result and not result[0]:
+        flash(f'{req.name} isteği zaten işlenmiş.', 'info')
+    elif result and action == 'approve':
         flash(f'{req.name} kulübü onaylandı ve oluşturuldu.', 'success')
-    elif action == 'reject':
-        req.status = 'rejected'
+    elif result:
         flash(f'{req.name} kulübü isteği reddedildi.', 'warning')
-        
-    db.session.commit()
     return redirect(url_for('club.list_requests'))
 
+@club_bp.route('/admin/requests/bulk', methods=['POST'])
+@login_required
+def bulk_handle_requests():
+    # Form posts from the request list, or JSON {"ids": [...], "action": "approve"}
+    if current_user.role != 'admin':
+        abort(403)
+    data = request.get_json(silent=True)
+    if request.is_json:
+        # Ids must be plain ints; JSON true/false would pass isinstance(i, int)
+        if not isinstance(data, dict):
+            abort(400)
+        ids, action = data.get('ids'), data.get('action')
+        if not isinstance(ids, list) or not all(type(i) is int for i in ids):
+            abort(400)
+    else:
+        ids, action = request.form.getlist('ids', type=int), request.form.get('action')
+    if action not in MODERATION_ACTIONS or len(ids) > BULK_MODERATION_MAX:
+        abort(400)
+
+    result = _moderate(ids, action) if ids else ([], [])
+    if request.is_json:
+        if result is None:
+            return jsonify(error='conflict'), 409
+        handled, club_ids = result
+        return jsonify(action=action, handled=handled, club_ids=club_ids,
+                       skipped=sorted(set(ids) - set(handled)))
+    if result is not None:
+        handled, _ = result
+        if handled:
+            verb = 'onaylandı' if action == 'approve' else 'reddedildi'
+            flash(f'{len(handled)} kulüp isteği {verb}.', 'success' if action == 'approve' else 'warning')
+        skipped = len(set(ids) - set(handled))
+        if skipped:
+            flash(f'{skipped} istek bekleyen durumda olmadığı için atlandı.', 'info')
+    return redirect(url_for('club.list_requests', q=request.form.get('q') or None,
+                            user=request.form.get('user') or None))
+
 @club_bp.route('/club/<int:club_id>')
+@read_only
+@cached_page('club:{club_id}')
 def view_club(club_id):
-    club = Club.query.get_or_404(club_id)
-    events = club.events
-    return render_template('club_detail.html', club=club, events=events)
+    club = Club.with_counts().filter(Club.id == club_id).first_or_404()
+    events = keyset_paginate(Event.query.filter_by(club_id=club_id), [Event.date, Event.id])
+    if wants_json():
+        return jsonify(club=club.to_dict(), **events.to_dict())
+    is_member = current_user.is_authenticated and club.has_member(current_user)
+    members = club.members.order_by(User.username).limit(MEMBER_LIST_LIMIT).all()
+    return render_template('club_detail.html', club=club, events=events,
+                           is_member=is_member, members=members)
 
 @club_bp.route('/club/<int:club_id>/join')
 @login_required
+@limit('join')
 def join_club(club_id):
     club = Club.query.get_or_404(club_id)
-    if current_user not in club.members:
-        club.members.append(current_user)
+    if club.add_member(current_user):
         db.session.commit()
+        cache.bump('clubs', f'club:{club_id}')
         flash(f'{club.name} kulübüne başarıyla katıldınız!', 'success')
     else:
         flash(f'Zaten {club.name} kulübünün üyesisiniz.', 'info')
@@ -159,11 +316,12 @@ def join_club(club_id):
 
 @club_bp.route('/club/<int:club_id>/leave')
 @login_required
+@limit('join')
 def leave_club(club_id):
     club = Club.query.get_or_404(club_id)
-    if current_user in club.members:
-        club.members.remove(current_user)
+    if club.remove_member(current_user):
         db.session.commit()
+        cache.bump('clubs', f'club:{club_id}')
         flash(f'{club.name} kulübünden ayrıldınız.', 'warning')
     else:
         flash(f'{club.name} kulübünün üyesi değilsiniz.', 'info')
@@ -176,14 +334,21 @@ def delete_club(club_id):
         flash('Bu işlem için yönetici yetkisi gerekiyor.', 'danger')
         return redirect(url_for('club.list_clubs'))
     
-    club = Club.query.get_or_404(club_id)
-    
-    # Delete associated events first
-    for event in club.events:
-        db.session.delete(event)
-        
-    db.session.delete(club)
+    Club.query.get_or_404(club_id)
+
+    # Set-based deletes, children first; the search index catches up in the background
+    event_ids = db.session.execute(select(Event.id).where(Event.club_id == club_id)).scalars().all()
+    club_events = select(Event.id).where(Event.club_id == club_id)
+    db.session.execute(delete(event_attendees).where(event_attendees.c.event_id.in_(club_events)))
+    db.session.execute(delete(event_waitlist).where(event_waitlist.c.event_id.in_(club_events)))
+    db.session.execute(delete(Event).where(Event.club_id == club_id))
+    db.session.execute(delete(club_members).where(club_members.c.club_id == club_id))
+    db.session.execute(delete(Club).where(Club.id == club_id))
+    enqueue('search', entity='event', ids=event_ids)
+    enqueue('search', entity='club', ids=[club_id])
     db.session.commit()
+    cache.bump('clubs', f'club:{club_id}', 'events', f'calendar:{club_id}',
+               *[f'event:{event_id}' for event_id in event_ids])
     flash('Kulüp başarıyla silindi.', 'success')
     return redirect(url_for('club.list_clubs'))
     events = Event.query.filter_by(club_id=club_id).all()
@@ -204,48 +369,140 @@ def create_event(club_id):
         description = request.form.get('description')
         date_str = request.form.get('date')
         location = request.form.get('location')
-        
+        # Empty means unlimited; anything else must be a whole number >= 1
+        capacity = (request.form.get('capacity') or '').strip() or None
+        if capacity is not None:
+            try:
+                capacity = int(capacity)
+            except ValueError:
+                capacity = 0
+            if capacity < 1:
+                flash('Kontenjan en az 1 olmalı.', 'danger')
+                return redirect(url_for('event.create_event', club_id=club_id))
+
         try:
             date = datetime.strptime(date_str, '%Y-%m-%dT%H:%M')
         except ValueError:
             flash('Geçersiz tarih formatı.', 'danger')
             return redirect(url_for('event.create_event', club_id=club_id))
 
-        event = Event(name=name, description=description, date=date, 
-                     location=location, club_id=club_id)
+        event = Event(name=name, description=description, date=date,
+                     location=location, club_id=club_id, capacity=capacity)
         db.session.add(event)
+        db.session.flush()
+        enqueue('search', entity='event', ids=[event.id])
         db.session.commit()
+        cache.bump('clubs', f'club:{club_id}', 'events', f'calendar:{club_id}')
         
         flash('Etkinlik başarıyla oluşturuldu!', 'success')
         return redirect(url_for('club.view_club', club_id=club_id))
     
     return render_template('create_event.html', club=club)
 
+def _date_arg(name, end_of_day=False):
+    # end_of_day: a bare date (YYYY-MM-DD, as the form's date picker sends)
+    # becomes the start of the next day, so a `< end` filter includes that day
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        abort(400)
+    if end_of_day and len(value) == 10:
+        parsed += timedelta(days=1)
+    return parsed
+
+@event_bp.route('/upcoming')
+@read_only
+@cached_page('events')
+def upcoming_events():
+    # Range scan on the date index; ?club= (repeatable) narrows to some clubs
+    start = _date_arg('from') or datetime.now()
+    end = _date_arg('to', end_of_day=True)
+    club_ids = request.args.getlist('club', type=int)
+    query = Event.query.options(joinedload(Event.club)).filter(Event.date >= start)
+    if end:
+        query = query.filter(Event.date < end)
+    if club_ids:
+        query = query.filter(Event.club_id.in_(club_ids))
+
+    if request.args.get('format') == 'ics':
+        events = keyset_paginate(query, [Event.date, Event.id], per_page=CALENDAR_LIMIT)
+        return current_app.response_class(render_calendar(events, 'Yaklaşan Etkinlikler'),
+                                          mimetype='text/calendar')
+    events = keyset_paginate(query, [Event.date, Event.id])
+    if wants_json():
+        return jsonify(events.to_dict())
+    clubs = db.session.query(Club.id, Club.name).order_by(Club.name).all()
+    return render_template('upcoming_events.html', events=events, clubs=clubs,
+                           club_ids=club_ids, start=start, end=end)
+
+@event_bp.route('/club/<int:club_id>.ics')
+@read_only
+def club_calendar(club_id):
+    # Calendar apps poll this; the document is rebuilt only after create_event
+    # or delete_club bumps the club's calendar namespace
+    key = cache.key(f'ics:club:{club_id}', [f'calendar:{club_id}'])
+    body = cache.get(key)
+    if body is None:
+        fill_from_primary()
+        club = Club.query.get_or_404(club_id)
+        events = (Event.query.filter(Event.club_id == club_id,
+                                     Event.date >= datetime.now() - CALENDAR_HISTORY)
+                  .order_by(Event.date, Event.id).limit(CALENDAR_LIMIT).all())
+        body = render_calendar(events, club.name)
+        cache.set(key, body)
+    return current_app.response_class(body, mimetype='text/calendar')
+
 @event_bp.route('/event/<int:event_id>')
+@read_only
+@cached_page('event:{event_id}')
 def view_event(event_id):
     event = Event.query.get_or_404(event_id)
-    return render_template('event_detail.html', event=event)
+    is_attending = current_user.is_authenticated and event.has_attendee(current_user)
+    attendees = event.attendees.order_by(User.username).limit(MEMBER_LIST_LIMIT).all()
+    waitlist_count = waitlist_position = None
+    if event.capacity is not None:
+        waitlist_count = event.waitlist_count()
+        if current_user.is_authenticated and not is_attending and waitlist_count:
+            waitlist_position = event.waitlist_position(current_user)
+    return render_template('event_detail.html', event=event, is_attending=is_attending,
+                           attendees=attendees, waitlist_count=waitlist_count,
+                           waitlist_position=waitlist_position)
 
 @event_bp.route('/event/<int:event_id>/join')
 @login_required
+@limit('join')
 def join_event(event_id):
     event = Event.query.get_or_404(event_id)
-    if current_user not in event.attendees:
-        event.attendees.append(current_user)
+    status = event.join(current_user)
+    if status in ('joined', 'waitlisted'):
         db.session.commit()
+        cache.bump('events', f'event:{event_id}', f'club:{event.club_id}')
+    if status == 'joined':
         flash(f'{event.name} etkinliğine katıldınız!', 'success')
+    elif status == 'waitlisted':
+        flash(f'{event.name} etkinliği dolu; bekleme listesine eklendiniz.', 'info')
+    elif status == 'waiting':
+        flash(f'Zaten {event.name} etkinliğinin bekleme listesindesiniz.', 'info')
     else:
         flash(f'Zaten {event.name} etkinliğine katılıyorsunuz.', 'info')
     return redirect(url_for('event.view_event', event_id=event_id))
 
 @event_bp.route('/event/<int:event_id>/leave')
 @login_required
+@limit('join')
 def leave_event(event_id):
     event = Event.query.get_or_404(event_id)
-    if current_user in event.attendees:
-        event.attendees.remove(current_user)
+    status = event.leave(current_user)
+    if status:
         db.session.commit()
+        cache.bump('events', f'event:{event_id}', f'club:{event.club_id}')
+    if status == 'left':
         flash(f'{event.name} etkinliğinden ayrıldınız.', 'warning')
+    elif status == 'unwaitlisted':
+        flash(f'{event.name} etkinliğinin bekleme listesinden çıktınız.', 'warning')
     else:
         flash(f'{event.name} etkinliğine katılmıyorsunuz.', 'info')
     return redirect(url_for('event.view_event', event_id=event_id))
@@ -0,0 +1,50 @@
+from sqlalchemy import text, inspect
+from . import db
+from .counters import recount
+from .search import ensure_indexes as ensure_search_indexes, reindex
+
+# Columns added after the first release. Each entry is (table, column, DDL type,
+# backfill), where backfill names a counters.COUNTERS entry to fill in or None.
+# db.create_all() never alters existing tables, so older databases are patched here.
+ADDED_COLUMNS = [
+    ('club', 'image_url', 'VARCHAR(255)', None),
+    ('club', 'member_count', 'INTEGER NOT NULL DEFAULT 0', 'members'),
+    ('event', 'attendee_count', 'INTEGER NOT NULL DEFAULT 0', 'attendees'),
+    ('event', 'capacity', 'INTEGER', None),
+]
+
+
+def upgrade_schema():
+    # Create missing tables, then add any missing columns to existing ones.
+    # Safe to run repeatedly; meant for `flask db-upgrade`, not for worker startup.
+    from . import models  # noqa: F401  (register models on db.metadata)
+
+    # Primary only; replicas get their schema from replication
+    db.create_all(bind_key=None)
+
+    inspector = inspect(db.engine)
+    applied = []
+    for table, column, ddl_type, backfill in ADDED_COLUMNS:
+        cols = [c['name'] for c in inspector.get_columns(table)]
+        if column not in cols:
+            with db.engine.begin() as conn:
+                conn.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} {ddl_type}'))
+            if backfill:
+                recount(backfill)
+                db.session.commit()
+            applied.append(f'{table}.{column}')
+
+    # create_all() only builds indexes together with new tables
+    for table in db.metadata.sorted_tables:
+        existing = {ix['name'] for ix in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind=db.engine)
+                applied.append(index.name)
+
+    # Full-text index tables are raw DDL (FTS5 / tsvector), not models;
+    # a newly created index is filled from the existing rows
+    created = ensure_search_indexes()
+    if created:
+        reindex()
+    return applied + created
@@ -0,0 +1,158 @@
+import re
+
+from sqlalchemy import inspect, select, text
+from sqlalchemy.orm import joinedload
+
+from . import db
+from .models import Club, Event
+
+# Full-text search over clubs and events. Each has its own index table keyed
+# by the entity id (club_search / event_search): an FTS5 virtual table on
+# SQLite, a tsvector column with a GIN index on Postgres. Text is folded in
+# Python before it is indexed and before it is queried, so "kultur", "KÜLTÜR"
+# and "Kültür" all match, and the database only ever sees plain ASCII-ish
+# lowercase words.
+TURKISH_FOLD = str.maketrans('ışğüöçâîû', 'isguocaiu')
+MAX_TERMS = 8
+
+# kind -> (index table, id column on Postgres)
+INDEXES = {
+    'club': ('club_search', 'club_id'),
+    'event': ('event_search', 'event_id'),
+}
+
+
+def fold(value):
+    # Turkish lowercasing first (İ -> i, I -> ı), then drop the diacritics
+    value = (value or '').replace('İ', 'i').replace('I', 'ı').lower()
+    return value.translate(TURKISH_FOLD)
+
+
+def terms(query):
+    return re.findall(r'\w+', fold(query))[:MAX_TERMS]
+
+
+def _dialect():
+    return db.session.get_bind().dialect.name
+
+
+def ensure_indexes():
+    # Called from upgrade_schema(); returns the index tables it had to create
+    created = []
+    postgres = db.engine.dialect.name == 'postgresql'
+    existing = set(inspect(db.engine).get_table_names())
+    with db.engine.begin() as conn:
+        for table, id_column in INDEXES.values():
+            if postgres and table not in existing:
+                conn.execute(text(f'CREATE TABLE {table} ({id_column} INTEGER PRIMARY KEY, '
+                                  f'document TSVECTOR NOT NULL)'))
+                conn.execute(text(f'CREATE INDEX ix_{table}_document ON {table} USING GIN (document)'))
+                created.append(table)
+            elif not postgres and not conn.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE name = :name"), {'name': table}).first():
+                conn.execute(text(f'CREATE VIRTUAL TABLE {table} USING fts5(title, body, '
+                                  f"tokenize = 'unicode61 remove_diacritics 2')"))
+                created.append(table)
+    return created
+
+
+def _insert_sql(kind):
+    table, id_column = INDEXES[kind]
+    if _dialect() == 'postgresql':
+        return text(f"INSERT INTO {table} ({id_column}, document) VALUES (:id, "
+                    f"setweight(to_tsvector('simple', :title), 'A') || "
+                    f"setweight(to_tsvector('simple', :body), 'B'))")
+    return text(f'INSERT INTO {table} (rowid, title, body) VALUES (:id, :title, :body)')
+
+
+def _delete_sql(kind):
+    table, id_column = INDEXES[kind]
+    key = id_column if _dialect() == 'postgresql' else 'rowid'
+    return text(f'DELETE FROM {table} WHERE {key} = :id')
+
+
+def _club_document(club):
+    return {'id': club.id, 'title': fold(club.name), 'body': fold(club.description)}
+
+
+def _event_document(event):
+    return {'id': event.id, 'title': fold(event.name),
+            'body': fold(f'{event.description or ""} {event.location or ""}')}
+
+
+def unindex(kind, ids):
+    if ids:
+        db.session.execute(_delete_sql(kind), [{'id': id_} for id_ in ids])
+
+
+def sync(kind, ids):
+    # Brings the index rows for these ids in line with the table: rows that
+    # still exist are re-indexed, deleted ones are dropped
+    unindex(kind, ids)
+    if kind == 'club':
+        rows = db.session.execute(select(Club.id, Club.name, Club.description)
+                                  .where(Club.id.in_(ids)))
+        documents = [_club_document(row) for row in rows]
+    else:
+        rows = db.session.execute(select(Event.id, Event.name, Event.description, Event.location)
+                                  .where(Event.id.in_(ids)))
+        documents = [_event_document(row) for row in rows]
+    if documents:
+        db.session.execute(_insert_sql(kind), documents)
+
+
+def reindex(batch_size=1000):
+    # Rebuild both indexes from the club and event tables; returns row counts
+    counts = {}
+    sources = {
+        'club': (select(Club.id, Club.name, Club.description), _club_document),
+        'event': (select(Event.id, Event.name, Event.description, Event.location), _event_document),
+    }
+    for kind, (query, document) in sources.items():
+        table = INDEXES[kind][0]
+        db.session.execute(text(f'DELETE FROM {table}'))
+        insert = _insert_sql(kind)
+        counts[kind] = 0
+        rows = db.session.execute(query.execution_options(yield_per=batch_size))
+        for chunk in rows.partitions():
+            db.session.execute(insert, [document(row) for row in chunk])
+            counts[kind] += len(chunk)
+        if _dialect() == 'sqlite':
+            db.session.execute(text(f"INSERT INTO {table} ({table}) VALUES ('optimize')"))
+    db.session.commit()
+    return counts
+
+
+def search_ids(kind, query, limit=20):
+    # Best-ranked ids for a query; every term must match as a word or word prefix
+    words = terms(query)
+    if not words:
+        return []
+    table, id_column = INDEXES[kind]
+    if _dialect() == 'postgresql':
+        tsquery = ' & '.join(f'{word}:*' for word in words)
+        sql = text(f"SELECT {id_column} FROM {table}, to_tsquery('simple', :q) tsq "
+                   f"WHERE document @@ tsq ORDER BY ts_rank(document, tsq) DESC, {id_column} "
+                   f"LIMIT :limit")
+        params = {'q': tsquery, 'limit': limit}
+    else:
+        match = ' '.join(f'"{word}"*' for word in words)
+        # bm25: lower is better; a hit in the title counts ten times one in the body
+        sql = text(f'SELECT rowid FROM {table} WHERE {table} MATCH :q '
+                   f'ORDER BY bm25({table}, 10.0, 1.0), rowid LIMIT :limit')
+        params = {'q': match, 'limit': limit}
+    return [row[0] for row in db.session.execute(sql, params)]
+
+
+def search(query, kinds=('club', 'event'), limit=20):
+    # {'club': [Club, ...], 'event': [Event, ...]} in rank order
+    results = {}
+    for kind in kinds:
+        ids = search_ids(kind, query, limit)
+        if kind == 'club':
+            rows = Club.query.filter(Club.id.in_(ids)).all() if ids else []
+        else:
+            rows = Event.query.options(joinedload(Event.club)).filter(Event.id.in_(ids)).all() if ids else []
+        by_id = {row.id: row for row in rows}
+        results[kind] = [by_id[id_] for id_ in ids if id_ in by_id]
+    return results
@@ -0,0 +1,102 @@
+import datetime
+import random
+
+from . import db
+from .passwords import hasher
+from .counters import recount_all
+from .search import reindex
+from .models import User, Club, Event, club_members
+
+SEED_USERS = ['alice', 'berat', 'efe', 'mehmet', 'ayse', 'fatma', 'ali', 'veli', 'zeynep', 'can']
+
+TARGET_CLUBS = [
+    {'name': 'Bilişim ve Teknoloji Kulübü', 'desc': 'Yazılım, donanım ve teknoloji çalışmalarına odaklı kulüp.', 'img': 'teknoloji.jpg'},
+    {'name': 'Spor ve Yaşam Kulübü', 'desc': 'Farklı spor dallarında etkinlikler ve turnuvalar.', 'img': 'spor.jpg'},
+    {'name': 'Güzel Sanatlar Kulübü', 'desc': 'Resim ve heykel çalışmaları.', 'img': 'sanat.jpg'},
+    {'name': 'Müzik Topluluğu', 'desc': 'Müzik pratikleri, konserler ve performanslar.', 'img': 'muzik.jpg'},
+    {'name': 'Edebiyat ve Kültür Kulübü', 'desc': 'Okuma grupları ve edebi etkinlikler.', 'img': 'edebiyat.jpg'},
+    {'name': 'Sahne Sanatları Kulübü', 'desc': 'Sahne sanatları ve oyunculuk atölyeleri.', 'img': 'tiyatro.jpg'}
+]
+
+
+def seed_users():
+    # One query for all seed users; only missing ones pay for a password hash
+    wanted = ['admin'] + SEED_USERS
+    existing = {u.username for u in User.query.filter(User.username.in_(wanted))}
+
+    missing = [name for name in wanted if name not in existing]
+    passwords = ['adminpass' if name == 'admin' else 'password123' for name in missing]
+    # Hash all missing users' passwords in parallel on the hashing pool
+    for name, pwhash in zip(missing, hasher.hash_many(passwords)):
+        role = 'admin' if name == 'admin' else 'member'
+        db.session.add(User(username=name, email=f'{name}@example.com', role=role, password_hash=pwhash))
+    db.session.commit()
+
+
+def sync_clubs():
+    # Create needed clubs, update existing ones and delete the rest in one transaction
+    target_names = [c['name'] for c in TARGET_CLUBS]
+    existing = {c.name: c for c in Club.query.all()}
+
+    for name, club in existing.items():
+        if name not in target_names:
+            Event.query.filter_by(club_id=club.id).delete()
+            db.session.execute(club_members.delete().where(club_members.c.club_id == club.id))
+            db.session.delete(club)
+
+    user_ids = [uid for (uid,) in db.session.query(User.id)]
+    for data in TARGET_CLUBS:
+        club = existing.get(data['name'])
+        image_path = f'/static/img/{data["img"]}'
+
+        if club:
+            club.description = data['desc']
+            club.image_url = image_path
+        else:
+            club = Club(
+                name=data['name'],
+                description=data['desc'],
+                image_url=image_path,
+                president_id=random.choice(user_ids)
+            )
+            db.session.add(club)
+    db.session.commit()
+
+
+def seed_events_and_members():
+    all_users = User.query.all()
+    for club in Club.query.all():
+        # Ensure at least 1 event
+        if not club.events:
+            for j in range(random.randint(1, 2)):
+                days_offset = random.randint(5, 30)
+                ev = Event(
+                    name=f'{club.name} Etkinliği {j+1}',
+                    description=f'{club.name} tarafından düzenlenen harika bir etkinlik.',
+                    date=datetime.datetime.now() + datetime.timedelta(days=days_offset),
+                    location='Kampüs Merkezi',
+                    club_id=club.id,
+                    image_url=club.image_url
+                )
+                db.session.add(ev)
+
+        # Ensure some members
+        if not club.members.first():
+            potential_members = [u for u in all_users if u.id != club.president_id]
+            if potential_members:
+                members_to_add = random.sample(potential_members, k=min(len(potential_members), random.randint(3, 6)))
+                for m in members_to_add:
+                    club.members.append(m)
+    db.session.commit()
+
+
+def seed_data():
+    seed_users()
+    sync_clubs()
+    seed_events_and_members()
+    # Members are appended through the relationship, which bypasses the counters
+    recount_all()
+    db.session.commit()
+    # The seed adds and deletes clubs and events wholesale; rebuilding the
+    # search index is cheaper than tracking each change
+    reindex()
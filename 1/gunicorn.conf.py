@@ -0,0 +1,48 @@
+# Gunicorn settings for production. Every value can be overridden through the
+# environment, e.g. WEB_CONCURRENCY=3 GUNICORN_WORKER_CLASS=gevent.
+import os
+import multiprocessing
+
+
+def _cpu_count():
+    # Respect container CPU affinity where the platform exposes it
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return multiprocessing.cpu_count()
+
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+
+# gthread (default): a few threads per worker, so a slow request such as a
+# password hash no longer blocks the whole worker. sync: one request per
+# worker. gevent: cooperative greenlets, needs `pip install gevent`.
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+workers = int(os.environ.get('WEB_CONCURRENCY', min(_cpu_count() * 2 + 1, 9)))
+threads = int(os.environ.get('GUNICORN_THREADS', 4 if worker_class == 'gthread' else 1))
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 100))
+
+# create_app() no longer touches the database, so the app can be imported once
+# in the master and shared copy-on-write by all workers
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = 30
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+# Recycle workers now and then to cap slow memory growth
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = 100
+
+accesslog = os.environ.get('GUNICORN_ACCESSLOG', '-')
+
+
+def post_fork(server, worker):
+    # Pooled connections opened in the master (e.g. by AUTO_SEED) must not be
+    # shared with workers; drop them without closing the master's sockets
+    if not preload_app:
+        return
+    from app import db
+    app = server.app.wsgi()
+    with app.app_context():
+        db.engine.dispose(close=False)
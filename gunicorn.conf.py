@@ -0,0 +1,6 @@
+# Deployments started from the repository root use the same settings as 1/
+import os
+
+_config = os.path.join(os.path.dirname(os.path.abspath(__file__)), '1', 'gunicorn.conf.py')
+with open(_config) as f:
+    exec(compile(f.read(), _config, 'exec'))
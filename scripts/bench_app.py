@@ -0,0 +1,271 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# End-to-end benchmark of the real routes on a synthetic dataset (see
+# gen_dataset.py). Each endpoint runs in its own forked process through the
+# Flask test client, so its peak RSS is its own; the report has p50/p95/p99
+# latency, SQL statements per request and peak RSS. With --url the same
+# endpoints are driven over HTTP by loadgen.py instead (latency only).
+# Results can be saved with --out and compared against an earlier run with
+# --compare, which exits non-zero on a regression.
+#
+#   python scripts/gen_dataset.py /tmp/bench.db --users 100000
+#   python scripts/bench_app.py --db /tmp/bench.db --out before.json
+#   python scripts/bench_app.py --db /tmp/bench.db --compare before.json
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(repo_root, '1'))
+
+import gen_dataset
+import loadgen
+
+# (name, paths cycled through, who is logged in)
+ENDPOINTS = [
+    ('index', ['/'], None),
+    ('clubs', ['/club/clubs'], None),
+    ('clubs_json', ['/club/clubs?format=json&per_page=100'], None),
+    ('club_popular', ['/club/club/{popular_club}'], None),
+    ('club_popular_member', ['/club/club/{popular_club}'], 'member'),
+    ('event_popular', ['/event/event/{popular_event}'], None),
+    ('upcoming', ['/event/upcoming'], None),
+    ('search', ['/search?q=konser', '/search?q=satranc+turnuva', '/search?q=fotog'], None),
+    ('join_leave', ['/club/club/{popular_club}/join', '/club/club/{popular_club}/leave'], 'member'),
+    ('admin_users', ['/admin/users'], 'admin'),
+    ('admin_requests', ['/club/admin/requests'], 'admin'),
+]
+MIN_SLOWDOWN_MS = 1.0
+LOGINS = {'member': ('user0', gen_dataset.BENCH_PASSWORD), 'admin': ('admin', 'adminpass')}
+
+
+def targets(db):
+    # The most popular club and event, i.e. the largest fan-out
+    from app.models import Club, Event
+    popular_club = db.session.query(Club.id).order_by(Club.member_count.desc()).limit(1).scalar()
+    popular_event = db.session.query(Event.id).order_by(Event.attendee_count.desc()).limit(1).scalar()
+    return {'popular_club': popular_club, 'popular_event': popular_event}
+
+
+def rss_mb():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+
+
+def clients(app):
+    # Logged in up front: a password check allocates far more than any page
+    # and would otherwise show up as every logged-in endpoint's peak RSS
+    result = {None: app.test_client()}
+    for who, (username, password) in LOGINS.items():
+        result[who] = app.test_client()
+        result[who].post('/auth/login', data={'username': username, 'password': password})
+    return result
+
+
+def measure(engine, client, paths, requests, warmup):
+    from sqlalchemy import event
+
+    statements = [0]
+
+    def count(*args):
+        statements[0] += 1
+
+    for i in range(warmup):
+        client.get(paths[i % len(paths)])
+    event.listen(engine, 'before_cursor_execute', count)
+    latencies, queries, errors = [], [], 0
+    for i in range(requests):
+        statements[0] = 0
+        start = time.perf_counter()
+        response = client.get(paths[i % len(paths)])
+        latencies.append(time.perf_counter() - start)
+        queries.append(statements[0])
+        if response.status_code >= 400:
+            errors += 1
+    event.remove(engine, 'before_cursor_execute', count)
+
+    latencies.sort()
+    return {
+        'requests': requests,
+        'errors': errors,
+        'p50_ms': loadgen.percentile(latencies, 50) * 1000,
+        'p95_ms': loadgen.percentile(latencies, 95) * 1000,
+        'p99_ms': loadgen.percentile(latencies, 99) * 1000,
+        'queries': sum(queries) / len(queries),
+        'max_queries': max(queries),
+        # ru_maxrss is in KiB on Linux
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def run_isolated(engine, client, paths, requests, warmup):
+    # Fork so every endpoint starts from the same memory state and reports its own peak
+    if not hasattr(os, 'fork'):
+        return measure(engine, client, paths, requests, warmup)
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        engine.dispose(close=False)
+        try:
+            result = measure(engine, client, paths, requests, warmup)
+        except Exception as e:
+            result = {'error': repr(e)}
+        with os.fdopen(write_fd, 'w') as f:
+            json.dump(result, f)
+        os._exit(0)
+    os.close(write_fd)
+    with os.fdopen(read_fd) as f:
+        result = json.load(f)
+    os.waitpid(pid, 0)
+    return result
+
+
+def run_inprocess(args):
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.abspath(args.db)}'
+    # join_leave repeats one user's writes far past the per-user limit
+    os.environ['RATELIMIT_ENABLED'] = '0'
+    if not args.cache:
+        os.environ['CACHE_TYPE'] = 'null'
+    from app import create_app, db
+
+    app = create_app()
+    with app.app_context():
+        ids = targets(db)
+        engine = db.engine
+        db.session.remove()
+    # Requests must not run inside a shared app context: flask-login caches
+    # the current user on g, which would leak between the clients
+    logged_in = clients(app)
+    baseline = rss_mb()
+    results = {}
+    for name, paths, who in ENDPOINTS:
+        paths = [path.format(**ids) for path in paths]
+        results[name] = run_isolated(engine, logged_in[who], paths, args.requests, args.warmup)
+        results[name]['rss_growth_mb'] = results[name].get('peak_rss_mb', baseline) - baseline
+        report(name, results[name])
+    return results
+
+
+def run_http(args):
+    # Server-side numbers (queries, RSS) are not visible from here
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.abspath(args.db)}'
+    from app import create_app, db
+
+    with create_app().app_context():
+        ids = targets(db)
+    results = {}
+    for name, paths, who in ENDPOINTS:
+        if who:
+            continue
+        result = loadgen.run(args.url, [path.format(**ids) for path in paths],
+                             args.concurrency, args.duration)
+        results[name] = result
+        report(name, result)
+    return results
+
+
+def report(name, result):
+    if 'error' in result:
+        print(f'{name:<22} ERROR {result["error"]}')
+        return
+    line = (f'{name:<22} p50 {result["p50_ms"]:7.1f}  p95 {result["p95_ms"]:7.1f}  '
+            f'p99 {result["p99_ms"]:7.1f} ms')
+    if 'queries' in result:
+        line += f'  {result["queries"]:5.1f} q/req  peak {result["peak_rss_mb"]:6.1f} MB'
+    if 'rps' in result:
+        line += f'  {result["rps"]:7.1f} req/s'
+    if result.get('errors'):
+        line += f'  {result["errors"]} errors'
+    print(line)
+
+
+def compare(results, baseline, threshold):
+    # Regression: median slower by more than threshold (and by at least
+    # MIN_SLOWDOWN_MS, so sub-millisecond jitter doesn't count), or more SQL
+    # per request. p95/p99 are too noisy on a shared machine to gate on.
+    regressions = []
+    print(f'\n{"endpoint":<22} {"p50 before":>10} {"p50 now":>9} {"change":>8} '
+          f'{"p95 before/now":>16} {"queries":>12}')
+    for name, now in results.items():
+        before = baseline['endpoints'].get(name)
+        if not before or 'p50_ms' not in now or 'p50_ms' not in before:
+            continue
+        change = now['p50_ms'] / before['p50_ms'] - 1 if before['p50_ms'] else 0.0
+        queries = ''
+        if 'queries' in now and 'queries' in before:
+            queries = f'{before["queries"]:.1f} -> {now["queries"]:.1f}'
+        slower = change > threshold and now['p50_ms'] - before['p50_ms'] > MIN_SLOWDOWN_MS
+        flag = ''
+        if slower or now.get('queries', 0) > before.get('queries', 0) + 0.01:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        p95 = f'{before["p95_ms"]:.1f} / {now["p95_ms"]:.1f}'
+        print(f'{name:<22} {before["p50_ms"]:>10.1f} {now["p50_ms"]:>9.1f} {change:>+8.0%} '
+              f'{p95:>16} {queries:>12}{flag}')
+    return regressions
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=repo_root,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the app routes on a synthetic dataset.')
+    parser.add_argument('--db', help='dataset from gen_dataset.py (default: generate a fresh one)')
+    parser.add_argument('--users', type=int, default=10000, help='size of a generated dataset')
+    parser.add_argument('--clubs', type=int, default=1000)
+    parser.add_argument('--requests', type=int, default=200, help='requests per endpoint')
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--cache', action='store_true', help='keep the response cache on')
+    parser.add_argument('--url', help='drive a running server over HTTP instead')
+    parser.add_argument('-c', '--concurrency', type=int, default=8)
+    parser.add_argument('-d', '--duration', type=float, default=10.0)
+    parser.add_argument('--out', help='write results as JSON')
+    parser.add_argument('--compare', help='earlier results JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=0.3, help='allowed median slowdown (0.3 = 30%%)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        dataset = None
+        if not args.db:
+            args.db = os.path.join(tmp, 'bench.db')
+            print(f'Generating {args.users} users / {args.clubs} clubs ...')
+            dataset = gen_dataset.build(args.db, log=lambda line: None, users=args.users, clubs=args.clubs)
+        results = run_http(args) if args.url else run_inprocess(args)
+
+    output = {
+        'meta': {
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'mode': 'http' if args.url else 'test-client',
+            'cache': args.cache,
+            'requests': args.requests,
+            'dataset': dataset or args.db,
+        },
+        'endpoints': results,
+    }
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(output, f, indent=2)
+        print(f'Results written to {args.out}')
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print(f'FAIL: regressions in {", ".join(regressions)}')
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+import os
+import sys
+import tempfile
+import time
+
+# Anonymous page throughput with the response/fragment cache off (null) and on
+# (in-process LRU, and Redis through fakeredis when it is installed), driven
+# through the Flask test client. Every BUMP_EVERY rounds the namespaces are
+# bumped as a write would, so invalidation is part of the run.
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(repo_root, '1'))
+
+PAGES = ['/', '/club/clubs', '/club/club/1', '/event/event/1']
+ROUNDS = 200
+BUMP_EVERY = 50
+
+
+def run(cache_type, db_path, client=None):
+    # client: a redis-py compatible client for CACHE_TYPE=redis
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    os.environ['CACHE_TYPE'] = 'simple' if client else cache_type
+    from app import create_app
+    from app.cache import RedisCache, cache
+
+    app = create_app()
+    if client:
+        cache.backend = RedisCache(client, default_ttl=app.config['CACHE_DEFAULT_TIMEOUT'])
+    test_client = app.test_client()
+    start = time.perf_counter()
+    for i in range(ROUNDS):
+        if i and i % BUMP_EVERY == 0:
+            cache.bump('clubs', 'events', 'club:1', 'event:1')
+        for page in PAGES:
+            assert test_client.get(page).status_code == 200
+    elapsed = time.perf_counter() - start
+    return ROUNDS * len(PAGES) / elapsed, cache.stats()
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+        from app import create_app
+        from app.schema import upgrade_schema
+        from app.seed import seed_data
+        with create_app().app_context():
+            upgrade_schema()
+            seed_data()
+
+        baseline, _ = run('null', db_path)
+        cached, stats = run('simple', db_path)
+        try:
+            import fakeredis
+            shared = run('redis', db_path, fakeredis.FakeStrictRedis())
+        except ImportError:
+            shared = None
+
+    print(f'no cache   : {baseline:8.1f} req/s')
+    print(f'LRU cache  : {cached:8.1f} req/s  ({cached / baseline:.1f}x)  {stats}')
+    if shared:
+        print(f'Redis cache: {shared[0]:8.1f} req/s  ({shared[0] / baseline:.1f}x)  {shared[1]}')
+    else:
+        print('Redis cache: skipped, fakeredis not installed')
+
+
+if __name__ == '__main__':
+    main()
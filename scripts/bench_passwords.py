@@ -0,0 +1,55 @@
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Password verifications (= logins) per second for several hash settings,
+# on one thread and on the app's hashing pool with one worker per core.
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(repo_root, '1'))
+
+from app.passwords import PasswordHasher, _hash
+
+METHODS = ['scrypt:32768:8:1', 'pbkdf2:sha256:1000000', 'pbkdf2:sha256:600000', 'pbkdf2:sha256:100000']
+DURATION = 3.0
+
+
+class _Config:
+    def __init__(self, method, workers):
+        self.config = {'PASSWORD_HASH_METHOD': method, 'PASSWORD_HASH_WORKERS': workers}
+
+
+def logins_per_second(hasher, pwhash, callers):
+    # `callers` threads play request threads, all verifying through the hasher
+    count = 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=callers) as requests:
+        while time.perf_counter() - start < DURATION:
+            results = list(requests.map(lambda _: hasher.verify(pwhash, 'secret'), range(callers)))
+            assert all(results)
+            count += callers
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    cores = os.cpu_count() or 1
+    print(f'{cores} core(s)')
+    for method in METHODS:
+        pwhash = _hash('secret', method)
+
+        single = PasswordHasher()
+        single.init_app(_Config(method, 1))
+        one = logins_per_second(single, pwhash, 1)
+        single.shutdown()
+
+        pool = PasswordHasher()
+        pool.init_app(_Config(method, cores))
+        many = logins_per_second(pool, pwhash, cores * 4)
+        pool.shutdown()
+
+        print(f'{method:<24} 1 thread {one:7.1f} logins/s   pool({cores}) {many:7.1f} logins/s   '
+              f'{many / cores:7.1f} per core')
+
+
+if __name__ == '__main__':
+    main()
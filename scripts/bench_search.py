@@ -0,0 +1,102 @@
+import itertools
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Full-text search against a naive LIKE scan over a synthetic event table
+# (100k events by default, BENCH_EVENTS to change). Reports index build time
+# and per-query latency percentiles for both. LIKE is unranked and stops at
+# the first 20 matches, so it only wins on very common words; search ranks
+# every match, which is what the last query ("ba", a prefix of many of the
+# most frequent words) costs.
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(repo_root, '1'))
+
+EVENTS = int(os.environ.get('BENCH_EVENTS', 100000))
+CLUBS = 200
+ROUNDS = 50
+WORDS = ('müzik konser şiir dinletisi söyleşi atölye gezi turnuva satranç fotoğraf sergi '
+         'tiyatro gösteri kodlama yarışma robotik seminer panel doğa yürüyüşü kamp koşu '
+         'ışık gölge çizim resim dans halk oyunları kitap okuma kulübü buluşma tanışma').split()
+PLACES = ['Kampüs Merkezi', 'Spor Salonu', 'Konferans Salonu', 'Şişli', 'Kadıköy', 'Kütüphane']
+SYLLABLES = 'ba be ça çe da de ga ğı ka ke la le ma me na ne ra re sa se şa şe ta te ya ye za zü ol ör ın un'.split()
+# (search query, LIKE pattern on the name with the same intent)
+QUERIES = [('konser', 'konser'), ('satranc turnuva', 'satranç turnuva'),
+           ('fotog', 'fotoğ'), ('ISIK', 'ışık'), ('xyzzy', 'xyzzy'), ('ba', 'ba')]
+
+
+def vocabulary(rng, size=20000):
+    # Real text is Zipf-distributed: a few filler words everywhere, most words
+    # rare. The searchable topic words sit just below the 50 fillers.
+    words = [''.join(rng.choices(SYLLABLES, k=rng.randint(2, 4))) for _ in range(size - len(WORDS))]
+    words[50:50] = WORDS
+    cumulative = list(itertools.accumulate(1 / rank for rank in range(1, len(words) + 1)))
+    return words, cumulative
+
+
+def populate(db):
+    from app.models import Club, Event
+    rng = random.Random(7)
+    vocab, weights = vocabulary(rng)
+    db.session.execute(Club.__table__.insert(), [
+        {'name': f'Kulüp {i}', 'description': ' '.join(rng.sample(WORDS, 8))} for i in range(CLUBS)])
+    club_ids = [row[0] for row in db.session.query(Club.id)]
+    start = datetime(2025, 1, 1)
+    for offset in range(0, EVENTS, 10000):
+        db.session.execute(Event.__table__.insert(), [{
+            'name': ' '.join(rng.choices(vocab, cum_weights=weights, k=3)).capitalize(),
+            'description': ' '.join(rng.choices(vocab, cum_weights=weights, k=20)),
+            'location': rng.choice(PLACES),
+            'date': start + timedelta(hours=i),
+            'club_id': rng.choice(club_ids),
+        } for i in range(offset, min(offset + 10000, EVENTS))])
+    db.session.commit()
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return (statistics.median(samples) * 1000, samples[int(len(samples) * 0.95) - 1] * 1000)
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(tmp, "search.db")}'
+        from app import create_app, db
+        from app.models import Event
+        from app.schema import upgrade_schema
+        from app.search import reindex, search_ids
+
+        app = create_app()
+        with app.app_context():
+            upgrade_schema()
+            populate(db)
+            start = time.perf_counter()
+            counts = reindex()
+            print(f"reindex: {counts['event']} events, {counts['club']} clubs in "
+                  f'{time.perf_counter() - start:.1f}s')
+
+            print(f'{"query":<18} {"hits":>6} {"fts p50/p95 ms":>16} {"LIKE p50/p95 ms":>17}')
+            for query, pattern in QUERIES:
+                fts, like = [], []
+                for _ in range(ROUNDS):
+                    t = time.perf_counter()
+                    ids = search_ids('event', query, limit=20)
+                    fts.append(time.perf_counter() - t)
+                    t = time.perf_counter()
+                    words = pattern.split()
+                    q = Event.query.with_entities(Event.id)
+                    for word in words:
+                        q = q.filter(Event.name.ilike(f'%{word}%') | Event.description.ilike(f'%{word}%'))
+                    q.order_by(Event.id).limit(20).all()
+                    like.append(time.perf_counter() - t)
+                f50, f95 = percentiles(fts)
+                l50, l95 = percentiles(like)
+                print(f'{query:<18} {len(ids):>6} {f50:>7.2f} / {f95:<6.2f} {l50:>8.2f} / {l95:<6.2f}')
+
+
+if __name__ == '__main__':
+    main()
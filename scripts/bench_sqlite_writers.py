@@ -0,0 +1,106 @@
+import os
+import sys
+import tempfile
+import time
+from multiprocessing import Process, Queue
+
+# Concurrent join/leave load against one SQLite file, comparing the old
+# defaults (rollback journal, synchronous=FULL) with the WAL configuration.
+# Writer processes toggle club membership while reader processes load the
+# club page, all through the real routes. Both modes share the same busy
+# timeout, so the difference comes from the journal settings alone.
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(repo_root, '1'))
+
+WRITERS = 8
+READERS = 4
+DURATION = 5.0
+BUSY_TIMEOUT_MS = 200
+
+MODES = {
+    'rollback journal': {'SQLITE_JOURNAL_MODE': 'DELETE', 'SQLITE_SYNCHRONOUS': 'FULL'},
+    'WAL': {'SQLITE_JOURNAL_MODE': 'WAL', 'SQLITE_SYNCHRONOUS': 'NORMAL'},
+}
+
+
+def make_app(db_path, mode):
+    os.environ.update(MODES[mode])
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    os.environ['SQLITE_BUSY_TIMEOUT'] = str(BUSY_TIMEOUT_MS)
+    os.environ['CACHE_TYPE'] = 'null'
+    # Measures the database, not the admission control in front of it
+    os.environ['RATELIMIT_ENABLED'] = '0'
+    from app import create_app
+    return create_app()
+
+
+def prepare(db_path, mode):
+    app = make_app(db_path, mode)
+    from app import db
+    from app.models import User, Club
+    from app.schema import upgrade_schema
+    from werkzeug.security import generate_password_hash
+    with app.app_context():
+        upgrade_schema()
+        pw = generate_password_hash('p', method='pbkdf2:sha256:1')
+        db.session.add_all([User(username=f'w{i}', email=f'w{i}@example.com', password_hash=pw)
+                            for i in range(WRITERS + READERS)])
+        db.session.add(Club(name='Yük Testi', description='-', president_id=1))
+        db.session.commit()
+        db.session.remove()
+        db.engine.dispose()
+
+
+def worker(db_path, mode, index, writer, results):
+    app = make_app(db_path, mode)
+    client = app.test_client()
+    client.post('/auth/login', data={'username': f'w{index}', 'password': 'p'})
+    ok = errors = 0
+    deadline = time.monotonic() + DURATION
+    while time.monotonic() < deadline:
+        if writer:
+            url = '/club/club/1/join' if ok % 2 == 0 else '/club/club/1/leave'
+        else:
+            url = '/club/club/1'
+        status = client.get(url).status_code
+        if status < 500:
+            ok += 1
+        else:
+            errors += 1
+    results.put((writer, ok, errors))
+
+
+def run(mode):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'writers.db')
+        prepare(db_path, mode)
+
+        results = Queue()
+        procs = [Process(target=worker, args=(db_path, mode, i, i < WRITERS, results))
+                 for i in range(WRITERS + READERS)]
+        for p in procs:
+            p.start()
+        totals = {True: [0, 0], False: [0, 0]}
+        for _ in procs:
+            writer, ok, errors = results.get()
+            totals[writer][0] += ok
+            totals[writer][1] += errors
+        for p in procs:
+            p.join()
+    return totals
+
+
+def main():
+    # Silence the per-request tracebacks Flask logs for the 500s we count
+    import logging
+    logging.disable(logging.ERROR)
+    print(f'{WRITERS} writers + {READERS} readers for {DURATION:.0f}s, busy timeout {BUSY_TIMEOUT_MS} ms')
+    for mode in MODES:
+        totals = run(mode)
+        (w_ok, w_err), (r_ok, r_err) = totals[True], totals[False]
+        print(f'{mode:<17} joins/leaves {w_ok / DURATION:7.1f}/s  write errors {w_err:5d}  '
+              f'page reads {r_ok / DURATION:7.1f}/s  read errors {r_err:5d}')
+
+
+if __name__ == '__main__':
+    main()
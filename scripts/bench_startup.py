@@ -0,0 +1,74 @@
+import os
+import sys
+import sqlite3
+import statistics
+import subprocess
+import tempfile
+import time
+
+# Measures cold worker boot (python start + `import run`) against SQLite databases
+# of growing size. Boot time must not depend on how many rows the database holds.
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(repo_root, '1'))
+
+SIZES = [0, 10000, 100000]
+RUNS = 5
+# Largest dataset may boot at most this much slower than the empty one
+MAX_RATIO = 1.5
+
+
+def build_db(path, n_users):
+    os.environ['DATABASE_URL'] = f'sqlite:///{path}'
+    from app import create_app
+    from app.schema import upgrade_schema
+
+    app = create_app()
+    with app.app_context():
+        upgrade_schema()
+
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        'INSERT INTO user (username, email, password_hash, role) VALUES (?, ?, ?, ?)',
+        ((f'user{i}', f'user{i}@example.com', 'x', 'member') for i in range(n_users))
+    )
+    n_clubs = max(1, n_users // 100)
+    conn.executemany(
+        'INSERT INTO club (name, description, president_id) VALUES (?, ?, ?)',
+        ((f'Kulüp {i}', 'Açıklama', 1) for i in range(n_clubs))
+    )
+    conn.commit()
+    conn.close()
+
+
+def boot_time(path):
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{path}')
+    env.pop('AUTO_SEED', None)
+    samples = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', 'import run'], cwd=repo_root, env=env,
+                       check=True, stdout=subprocess.DEVNULL)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main():
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in SIZES:
+            path = os.path.join(tmp, f'bench_{size}.db')
+            build_db(path, size)
+            t = boot_time(path)
+            results.append((size, t))
+            print(f'users={size:>7}  boot={t * 1000:8.1f} ms')
+
+    ratio = results[-1][1] / results[0][1]
+    print(f'largest/empty ratio: {ratio:.2f}')
+    if ratio > MAX_RATIO:
+        print('FAIL: worker boot time grows with database size')
+        sys.exit(1)
+    print('OK: worker boot time is independent of database size')
+
+
+if __name__ == '__main__':
+    main()
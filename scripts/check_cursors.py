@@ -0,0 +1,93 @@
+import base64
+import json
+import os
+import re
+import sys
+import tempfile
+
+# Pagination cursors come from the client, so tampered ones must be answered
+# with 400, never a 500. Requests every keyset-paginated listing with a
+# well-formed cursor and the one it hands out (must work) and with tokens of
+# the wrong shape or type (must be 400).
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(repo_root, '1'))
+
+# Token payloads for an [id] key and a [date, id] key: one that must page on,
+# then the tampered ones
+GOOD_ID = [0]
+GOOD_DATE_ID = [{'dt': '2000-01-01T00:00:00'}, 0]
+BAD_ID = [['x'], [1, 1], [[1]], [{'a': 1}], [True], [1.5], [None], {'a': 1}, 'x', 1]
+BAD_DATE_ID = [['x', 1], [1, 1], [[1], 2], [{'dt': 1}, 1], [{'dt': 'x'}, 1],
+               [{'dt': '2030-01-01T00:00:00'}, True], [{'dt': '2030-01-01T00:00:00'}, 'x'],
+               [{'dt': '2030-01-01T00:00:00'}]]
+NOT_BASE64 = ['!!!', '%%', 'e30']
+
+
+def token(payload):
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def main():
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(tmp, "cursors.db")}'
+        os.environ['CACHE_TYPE'] = 'null'
+        os.environ['JOB_WORKERS'] = '0'
+        os.environ['PAGE_SIZE'] = '1'
+        from app import create_app, db
+        from app.models import Club
+        from app.schema import upgrade_schema
+        from app.seed import seed_data
+
+        app = create_app()
+        with app.app_context():
+            upgrade_schema()
+            seed_data()
+            club_id = db.session.query(Club.id).order_by(Club.id).limit(1).scalar()
+            db.session.remove()
+
+        admin = app.test_client()
+        admin.post('/auth/login', data={'username': 'admin', 'password': 'adminpass'})
+        listings = [('/club/clubs', GOOD_ID, BAD_ID), ('/admin/users', GOOD_ID, BAD_ID),
+                    ('/club/admin/requests', GOOD_ID, BAD_ID),
+                    (f'/club/club/{club_id}', GOOD_DATE_ID, BAD_DATE_ID),
+                    ('/event/upcoming', GOOD_DATE_ID, BAD_DATE_ID)]
+        for path, good, bad in listings:
+            first = admin.get(path, query_string={'format': 'json'})
+            cursor = first.get_json().get('next_cursor') if first.is_json else None
+            statuses = [('hand-made cursor', admin.get(path, query_string={'cursor': token(good)}).status_code, 200)]
+            if cursor:
+                statuses.append(('valid cursor', admin.get(path, query_string={'cursor': cursor}).status_code, 200))
+            for payload in bad:
+                response = admin.get(path, query_string={'cursor': token(payload)})
+                statuses.append((json.dumps(payload), response.status_code, 400))
+            for raw in NOT_BASE64:
+                statuses.append((raw, admin.get(path, query_string={'cursor': raw}).status_code, 400))
+            wrong = [f'{label} -> {got}' for label, got, expected in statuses if got != expected]
+            print(f'{path:<24} {len(statuses):>2} cursors{"" if not wrong else "  FAIL " + ", ".join(wrong)}')
+            failures += [f'{path} {item}' for item in wrong]
+
+        # Page links rebuild the URL; a query parameter named like a view
+        # argument must not break them
+        path = f'/club/club/{club_id}?per_page=1&club_id={club_id + 1}'
+        status = admin.get(path).status_code
+        print(f'{path:<24} {status}{"" if status == 200 else "  FAIL"}')
+        if status != 200:
+            failures.append(path)
+        # ... and repeated filters must all be carried to the next page
+        path = '/event/upcoming?per_page=1&from=2000-01-01&club=1&club=2'
+        html = admin.get(path).get_data(as_text=True)
+        links = re.findall(r'href="([^"]*cursor=[^"]*)"', html)
+        ok = bool(links) and all('club=1&amp;club=2' in link for link in links)
+        print(f'{path:<24} next link keeps club=1&club=2{"" if ok else "  FAIL"}')
+        if not ok:
+            failures.append(path)
+
+    if failures:
+        sys.exit(1)
+    print('OK: valid cursors page on, tampered ones are rejected with 400')
+
+
+if __name__ == '__main__':
+    main()
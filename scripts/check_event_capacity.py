@@ -0,0 +1,151 @@
+import os
+import sys
+import tempfile
+import threading
+from multiprocessing import Barrier, Process, Queue
+
+# Rush test for event capacity: USERS users in PROCESSES processes (a thread
+# per user) hit /join on one event with CAPACITY seats at the same moment,
+# then the first LEAVERS attendees leave at once. Fails if the event is ever
+# overbooked, attendee_count disagrees with the attendee rows, a user is both
+# attending and waiting, or the freed seats don't go to the head of the
+# waitlist in order.
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(repo_root, '1'))
+
+USERS = 400
+CAPACITY = 50
+PROCESSES = 8
+LEAVERS = 20
+
+
+def make_app(db_path):
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    os.environ['SQLITE_BUSY_TIMEOUT'] = '30000'
+    os.environ['CACHE_TYPE'] = 'null'
+    os.environ['JOB_WORKERS'] = '0'
+    # Every user logs in from the same address and joins at once
+    os.environ['RATELIMIT_ENABLED'] = '0'
+    from app import create_app
+    return create_app()
+
+
+def prepare(db_path):
+    app = make_app(db_path)
+    from datetime import datetime, timedelta
+    from werkzeug.security import generate_password_hash
+    from app import db
+    from app.models import User, Club, Event
+    from app.schema import upgrade_schema
+    with app.app_context():
+        upgrade_schema()
+        pw = generate_password_hash('p', method='pbkdf2:sha256:1')
+        db.session.add_all([User(username=f'r{i}', email=f'r{i}@example.com', password_hash=pw)
+                            for i in range(USERS)])
+        club = Club(name='Kontenjan Testi', description='-', president_id=1)
+        db.session.add(club)
+        db.session.flush()
+        event = Event(name='Dolu Etkinlik', date=datetime.now() + timedelta(days=1),
+                      club_id=club.id, capacity=CAPACITY)
+        db.session.add(event)
+        db.session.commit()
+        event_id = event.id
+        db.session.remove()
+        db.engine.dispose()
+    return event_id
+
+
+def worker(db_path, usernames, path, barrier, results):
+    app = make_app(db_path)
+    clients = []
+    for username in usernames:
+        client = app.test_client()
+        client.post('/auth/login', data={'username': username, 'password': 'p'})
+        clients.append(client)
+    statuses = []
+
+    def hit(client):
+        statuses.append(client.get(path).status_code)
+
+    threads = [threading.Thread(target=hit, args=(client,)) for client in clients]
+    barrier.wait()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    results.put(sum(1 for status in statuses if status >= 500))
+
+
+def rush(db_path, usernames, path):
+    # All users send their request at once; returns the number of 5xx responses
+    barrier = Barrier(PROCESSES)
+    results = Queue()
+    procs = [Process(target=worker, args=(db_path, usernames[i::PROCESSES], path, barrier, results))
+             for i in range(PROCESSES)]
+    for p in procs:
+        p.start()
+    errors = sum(results.get() for _ in procs)
+    for p in procs:
+        p.join()
+    return errors
+
+
+def state(db_path, event_id):
+    import sqlite3
+    conn = sqlite3.connect(db_path)
+    attending = [u for (u,) in conn.execute(
+        'SELECT user_id FROM event_attendees WHERE event_id = ? ORDER BY user_id', (event_id,))]
+    waiting = [u for (u,) in conn.execute(
+        'SELECT user_id FROM event_waitlist WHERE event_id = ? ORDER BY id', (event_id,))]
+    (count,) = conn.execute('SELECT attendee_count FROM event WHERE id = ?', (event_id,)).fetchone()
+    conn.close()
+    return attending, waiting, count
+
+
+def verify(label, attending, waiting, count, failures):
+    print(f'{label:<14} attending {len(attending):>4} (counter {count})  waiting {len(waiting):>4}')
+    if len(attending) > CAPACITY:
+        failures.append(f'{label}: overbooked, {len(attending)} attendees for {CAPACITY} seats')
+    if count != len(attending):
+        failures.append(f'{label}: attendee_count {count} but {len(attending)} attendee rows')
+    if set(attending) & set(waiting):
+        failures.append(f'{label}: users both attending and waiting')
+
+
+def main():
+    import logging
+    logging.disable(logging.ERROR)
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'capacity.db')
+        event_id = prepare(db_path)
+        usernames = [f'r{i}' for i in range(USERS)]
+
+        errors = rush(db_path, usernames, f'/event/event/{event_id}/join')
+        attending, waiting, count = state(db_path, event_id)
+        print(f'{USERS} simultaneous joins for {CAPACITY} seats, {errors} errors')
+        verify('after joins', attending, waiting, count, failures)
+        if len(attending) + len(waiting) != USERS - errors:
+            failures.append(f'joins: {USERS - errors} succeeded but only '
+                            f'{len(attending) + len(waiting)} users are attending or waiting')
+
+        # User ids are 1-based in creation order, so r{id - 1} is the username
+        leavers = [f'r{user_id - 1}' for user_id in attending[:LEAVERS]]
+        errors = rush(db_path, leavers, f'/event/event/{event_id}/leave')
+        after, waiting_after, count = state(db_path, event_id)
+        print(f'{len(leavers)} simultaneous leaves, {errors} errors')
+        verify('after leaves', after, waiting_after, count, failures)
+        promoted = sorted(set(after) - set(attending))
+        expected = sorted(waiting[:len(leavers) - errors])
+        if promoted != expected:
+            failures.append(f'leaves: promoted {promoted}, expected the head of the waitlist {expected}')
+
+    for failure in failures:
+        print(f'FAIL {failure}')
+    if failures:
+        sys.exit(1)
+    print('OK: no overbooking, counters consistent, waitlist promoted in order')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+import os
+import sys
+import datetime
+import tempfile
+
+# Counts SQL statements issued per listing request and fails if the number
+# grows with the number of clubs (an N+1 pattern creeping back).
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(repo_root, '1'))
+
+from sqlalchemy import event
+
+PAGES = ['/', '/club/clubs']
+SIZES = [3, 60]
+
+
+def fill(db, n_clubs):
+    from app.models import User, Club, Event
+    users = [User(username=f'user{i}', email=f'user{i}@example.com', password_hash='x') for i in range(20)]
+    db.session.add_all(users)
+    db.session.flush()
+    for i in range(n_clubs):
+        club = Club(name=f'Kulüp {i}', description='Açıklama', president_id=users[0].id)
+        club.members = users[:10]
+        db.session.add(club)
+        db.session.flush()
+        for j in range(3):
+            db.session.add(Event(name=f'Etkinlik {j}', date=datetime.datetime.now(), club_id=club.id))
+    db.session.commit()
+
+
+def count_queries(n_clubs):
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(tmp, "queries.db")}'
+        from app import create_app, db
+        from app.schema import upgrade_schema
+
+        app = create_app()
+        counts = {}
+        with app.app_context():
+            upgrade_schema()
+            fill(db, n_clubs)
+            statements = []
+            listener = lambda *args: statements.append(args[2])
+            event.listen(db.engine, 'before_cursor_execute', listener)
+            client = app.test_client()
+            for page in PAGES:
+                statements.clear()
+                assert client.get(page).status_code == 200
+                counts[page] = len(statements)
+            event.remove(db.engine, 'before_cursor_execute', listener)
+            db.session.remove()
+            db.engine.dispose()
+        return counts
+
+
+def main():
+    results = {size: count_queries(size) for size in SIZES}
+    failed = False
+    for page in PAGES:
+        per_size = [results[size][page] for size in SIZES]
+        print(f'{page:<14} ' + '  '.join(f'{size} clubs: {n} queries' for size, n in zip(SIZES, per_size)))
+        if len(set(per_size)) != 1:
+            failed = True
+    if failed:
+        print('FAIL: query count depends on number of clubs')
+        sys.exit(1)
+    print('OK: constant number of queries per listing request')
+
+
+if __name__ == '__main__':
+    main()
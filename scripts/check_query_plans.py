@@ -0,0 +1,90 @@
+import os
+import sys
+import sqlite3
+import tempfile
+
+# Replays every SELECT issued by the main routes through EXPLAIN QUERY PLAN on
+# SQLite and fails when a table is scanned without an index, unless that scan
+# is expected for the route (paging through a whole table by primary key).
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(repo_root, '1'))
+
+from sqlalchemy import event
+
+# (path, login as admin?, tables the route may scan)
+ROUTES = [
+    ('/', False, {'club'}),
+    ('/club/clubs', False, {'club'}),
+    ('/club/club/1', False, set()),
+    ('/event/event/1', False, set()),
+    ('/event/upcoming', False, set()),
+    ('/event/upcoming?club=1&club=2', False, set()),
+    ('/event/club/1.ics', False, set()),
+    ('/search?q=spor', False, set()),
+    ('/club/club/1', True, set()),
+    ('/event/event/1', True, set()),
+    ('/admin/users', True, {'user'}),
+    ('/club/admin/requests', True, set()),
+    ('/club/admin/requests?status=approved&user=alice&q=kul', True, set()),
+]
+
+
+def unindexed_scans(conn, statement, parameters):
+    scans = set()
+    for row in conn.execute(f'EXPLAIN QUERY PLAN {statement}', parameters):
+        detail = row[-1]
+        # "SCAN t" is a full table scan; "SCAN t USING [COVERING] INDEX ix" walks an index
+        # and "SCAN t VIRTUAL TABLE INDEX" is an FTS5 index lookup
+        if (detail.startswith('SCAN ') and 'USING' not in detail and 'CONSTANT ROW' not in detail
+                and 'VIRTUAL TABLE INDEX' not in detail):
+            table = detail.split()[1]
+            if not table.startswith('anon_'):
+                scans.add(table)
+    return scans
+
+
+def main():
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'plans.db')
+        os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+        os.environ['CACHE_TYPE'] = 'null'
+        from app import create_app, db
+        from app.schema import upgrade_schema
+        from app.seed import seed_data
+
+        app = create_app()
+        with app.app_context():
+            upgrade_schema()
+            seed_data()
+
+            captured = []
+
+            def capture(conn, cursor, statement, parameters, context, executemany):
+                if statement.lstrip().upper().startswith('SELECT'):
+                    captured.append((statement, parameters))
+
+            event.listen(db.engine, 'before_cursor_execute', capture)
+            raw = sqlite3.connect(db_path)
+            for path, as_admin, allowed in ROUTES:
+                client = app.test_client()
+                if as_admin:
+                    client.post('/auth/login', data={'username': 'admin', 'password': 'adminpass'})
+                captured.clear()
+                assert client.get(path).status_code == 200, path
+                for statement, parameters in captured:
+                    bad = unindexed_scans(raw, statement, parameters) - allowed
+                    if bad:
+                        failures.append((path, sorted(bad), ' '.join(statement.split())[:120]))
+                print(f'{path:<54} admin={as_admin!s:<5} {len(captured)} SELECTs checked')
+            raw.close()
+
+    for path, tables, statement in failures:
+        print(f'FAIL {path}: full scan of {", ".join(tables)} in: {statement}')
+    if failures:
+        sys.exit(1)
+    print('OK: no unexpected full table scans')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+import os
+import sys
+import tempfile
+import time
+
+# Admission control check. Drives the real login and join routes with small
+# limits and checks that the per-user and per-IP buckets turn requests away
+# with 429 + Retry-After once they are empty, that other clients are not
+# affected, that a full concurrency cap sheds requests immediately, that the
+# refusals show up in /admin/metrics, and that buckets refill over time. The
+# shared store is exercised with fakeredis when it is installed.
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(repo_root, '1'))
+
+LIMITS = {
+    'RATELIMIT_AUTH_USER': '3/minute',
+    'RATELIMIT_AUTH_IP': '5/minute',
+    'RATELIMIT_JOIN_USER': '4/minute',
+    'RATELIMIT_JOIN_IP': '0',
+    'CONCURRENCY_AUTH': '1',
+}
+
+
+def main():
+    failures = []
+
+    def expect(label, response, status):
+        ok = response.status_code == status and (status != 429 or response.headers.get('Retry-After'))
+        retry = response.headers.get('Retry-After', '-')
+        print(f'{label:<40} {response.status_code}  Retry-After {retry}{"" if ok else "  FAIL"}')
+        if not ok:
+            failures.append(label)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(tmp, "ratelimit.db")}'
+        os.environ['CACHE_TYPE'] = 'null'
+        os.environ['JOB_WORKERS'] = '0'
+        os.environ['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:1000'
+        os.environ.update(LIMITS)
+        from app import create_app, db
+        from app.models import Club
+        from app.ratelimit import limiter
+        from app.schema import upgrade_schema
+        from app.seed import seed_data
+
+        app = create_app()
+        with app.app_context():
+            upgrade_schema()
+            seed_data()
+            club_id = db.session.query(Club.id).order_by(Club.id).limit(1).scalar()
+            db.session.remove()
+
+        client = app.test_client()
+        wrong = {'username': 'alice', 'password': 'wrong'}
+        for i in range(3):
+            expect(f'wrong password for alice #{i + 1}', client.post('/auth/login', data=wrong), 200)
+        expect('alice bucket empty', client.post('/auth/login', data=wrong), 429)
+        expect('login form still shown', client.get('/auth/login'), 200)
+        expect('bob from the same IP', client.post('/auth/login', data={'username': 'bob', 'password': 'x'}), 200)
+        expect('IP bucket empty', client.post('/auth/login', data={'username': 'carol', 'password': 'x'}), 429)
+        other = app.test_client()
+        other.environ_base['REMOTE_ADDR'] = '10.0.0.2'
+        expect('alice from another IP (user bucket)', other.post('/auth/login', data=wrong), 429)
+        expect('admin from another IP', other.post('/auth/login',
+                                                   data={'username': 'admin', 'password': 'adminpass'}), 302)
+
+        for i in range(4):
+            path = f'/club/club/{club_id}/{"join" if i % 2 == 0 else "leave"}'
+            expect(f'admin join/leave #{i + 1}', other.get(path), 302)
+        expect('admin join bucket empty', other.get(f'/club/club/{club_id}/join'), 429)
+
+        # Hold the only auth slot, as a slow login in another thread would
+        limiter.clear()
+        third = app.test_client()
+        third.environ_base['REMOTE_ADDR'] = '10.0.0.3'
+        slot = limiter.slots['auth']
+        slot.acquire()
+        expect('login while the auth slot is taken', third.post('/auth/login', data=wrong), 429)
+        slot.release()
+        expect('login once the slot is free', third.post('/auth/login', data=wrong), 200)
+
+        text = other.get('/admin/metrics').get_data(as_text=True)
+        for series in ('rate_limited_requests_total{route_class="auth",key="user"}',
+                       'rate_limited_requests_total{route_class="auth",key="ip"}',
+                       'rate_limited_requests_total{route_class="join",key="user"}',
+                       'shed_requests_total{route_class="auth"}'):
+            ok = series in text
+            print(f'metrics: {series}{"" if ok else "  FAIL (missing)"}')
+            if not ok:
+                failures.append(f'metric {series}')
+
+    from app.ratelimit import MemoryStore, RedisStore
+    memory = MemoryStore()
+    stores = {'memory': lambda: memory}
+    try:
+        import fakeredis
+        server = fakeredis.FakeServer()
+        stores['redis (fakeredis)'] = lambda: RedisStore(fakeredis.FakeStrictRedis(server=server))
+    except ImportError:
+        print('fakeredis not installed, shared store skipped')
+    for name, make in stores.items():
+        # Two handles on the same buckets, like two workers sharing a store
+        first, second = make(), make()
+        taken = [first.take('refill', 20, 2), second.take('refill', 20, 2), first.take('refill', 20, 2)]
+        time.sleep(0.06)
+        taken.append(first.take('refill', 20, 2))
+        ok = [bool(wait) for wait in taken] == [False, False, True, False]
+        print(f'{name:<20} waits {[round(wait, 3) for wait in taken]}{"" if ok else "  FAIL"}')
+        if not ok:
+            failures.append(f'{name} store')
+
+    if failures:
+        print(f'FAIL: {", ".join(failures)}')
+        sys.exit(1)
+    print('OK: buckets and concurrency caps answer 429 with Retry-After and are counted')
+
+
+if __name__ == '__main__':
+    main()
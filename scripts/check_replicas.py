@@ -0,0 +1,138 @@
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Runs the app against a primary and a replica SQLite file kept in sync by
+# `flask replicate`'s backup copy and checks the routing: anonymous read-only
+# pages query only the replica, writes and the pages right after a user's own
+# write query only the primary, and once the read-your-writes window has
+# passed the replica serves the user again (showing its lag until the next
+# copy). With the page cache on, an anonymous cache miss must be built from
+# the primary (pages and the club calendar), so a lagging replica never ends
+# up cached as the current version.
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(repo_root, '1'))
+
+from sqlalchemy import event
+
+WINDOW = 0.5
+LEAVE_BUTTON = 'Kulüpten Ayrıl'
+
+
+def main():
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(tmp, "primary.db")}'
+        os.environ['DATABASE_REPLICA_URLS'] = f'sqlite:///{os.path.join(tmp, "replica.db")}'
+        os.environ['READ_YOUR_WRITES_SECONDS'] = str(WINDOW)
+        os.environ['CACHE_TYPE'] = 'null'
+        from app import create_app, db
+        from app.models import Club
+        from app.replicas import replicate
+        from app.schema import upgrade_schema
+        from app.seed import seed_data
+
+        app = create_app()
+        with app.app_context():
+            upgrade_schema()
+            seed_data()
+            replicate(db)
+            club_id = db.session.query(Club.id).order_by(Club.id).limit(1).scalar()
+            engines = {'primary': db.engine, 'replica': db.engines['replica1']}
+            db.session.remove()
+
+        counts = {'primary': 0, 'replica': 0}
+        for name, engine in engines.items():
+            event.listen(engine, 'before_cursor_execute',
+                         lambda *args, name=name: counts.__setitem__(name, counts[name] + 1))
+
+        def check(label, client, path, expect, is_member=None):
+            # is_member: whether the page must (not) show the leave button
+            counts.update(primary=0, replica=0)
+            response = client.get(path)
+            used = {name for name, count in counts.items() if count}
+            shown = LEAVE_BUTTON in response.get_data(as_text=True)
+            ok = used == {expect} and (is_member is None or shown == is_member)
+            print(f'{label:<34} primary {counts["primary"]:>2}  replica {counts["replica"]:>2}'
+                  f'{"" if ok else "  FAIL"}')
+            if not ok:
+                failures.append(label)
+
+        anonymous = app.test_client()
+        check('anonymous index', anonymous, '/', 'replica')
+        check('anonymous club page', anonymous, f'/club/club/{club_id}', 'replica')
+        check('anonymous event list', anonymous, '/event/upcoming', 'replica')
+
+        member = app.test_client()
+        member.post('/auth/login', data={'username': 'alice', 'password': 'password123'})
+        member.get(f'/club/club/{club_id}/leave')
+        with app.app_context():
+            replicate(db)
+        time.sleep(WINDOW)
+        check('join (write)', member, f'/club/club/{club_id}/join', 'primary')
+        check('club page right after join', member, f'/club/club/{club_id}', 'primary', True)
+        time.sleep(WINDOW)
+        check('club page after window (stale)', member, f'/club/club/{club_id}', 'replica', False)
+        with app.app_context():
+            replicate(db)
+        check('club page after replication', member, f'/club/club/{club_id}', 'replica', True)
+
+        from app.cache import LRUCache, cache
+        cache.backend = LRUCache()
+        path = f'/club/club/{club_id}?format=json'
+
+        def cached_count(label, expect_source, expect_count):
+            counts.update(primary=0, replica=0)
+            response = anonymous.get(path)
+            used = {name for name, count in counts.items() if count}
+            shown = response.get_json()['club']['member_count']
+            ok = used == expect_source and shown == expect_count
+            print(f'{label:<34} primary {counts["primary"]:>2}  replica {counts["replica"]:>2}  '
+                  f'{response.headers.get("X-Cache")} {shown} members{"" if ok else "  FAIL"}')
+            if not ok:
+                failures.append(label)
+
+        before = anonymous.get(path).get_json()['club']['member_count']
+        member.get(f'/club/club/{club_id}/leave')
+        cached_count('cached page miss after a write', {'primary'}, before - 1)
+        cached_count('cached page hit', set(), before - 1)
+        with app.app_context():
+            replicate(db)
+        cached_count('cached page hit after replication', set(), before - 1)
+
+        # The club calendar caches its .ics body itself, outside cached_page
+        admin = app.test_client()
+        admin.post('/auth/login', data={'username': 'admin', 'password': 'adminpass'})
+        with app.app_context():
+            replicate(db)
+        ics = f'/event/club/{club_id}.ics'
+        before = anonymous.get(ics).get_data(as_text=True).count('BEGIN:VEVENT')
+        admin.post(f'/event/event/create/{club_id}',
+                   data={'name': 'Replika Testi', 'description': '-', 'location': '-',
+                         'date': (datetime.now() + timedelta(days=2)).strftime('%Y-%m-%dT%H:%M')})
+
+        def calendar(label, expect_source):
+            counts.update(primary=0, replica=0)
+            shown = anonymous.get(ics).get_data(as_text=True).count('BEGIN:VEVENT')
+            used = {name for name, count in counts.items() if count}
+            ok = used == expect_source and shown == before + 1
+            print(f'{label:<34} primary {counts["primary"]:>2}  replica {counts["replica"]:>2}  '
+                  f'{shown} events{"" if ok else "  FAIL"}')
+            if not ok:
+                failures.append(label)
+
+        calendar('calendar miss after a new event', {'primary'})
+        with app.app_context():
+            replicate(db)
+        calendar('calendar hit after replication', set())
+
+    if failures:
+        print(f'FAIL: {", ".join(failures)}')
+        sys.exit(1)
+    print('OK: reads routed to the replica, writes and read-your-writes to the primary')
+
+
+if __name__ == '__main__':
+    main()
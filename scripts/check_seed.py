@@ -6,10 +6,14 @@ sys.path.insert(0, os.path.join(repo_root, '1'))
 from app import create_app
 from flask import url_for
 
-print('Creating app (this will also run seeding if DB is empty)...')
+print('Creating app and running schema upgrade + seeding...')
 app = create_app()
 
 with app.app_context():
+    from app.schema import upgrade_schema
+    from app.seed import seed_data
+    upgrade_schema()
+    seed_data()
     from app.models import Club, User
     club_count = Club.query.count()
     user_count = User.query.count()
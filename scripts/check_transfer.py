@@ -0,0 +1,61 @@
+import os
+import sys
+import tempfile
+
+# Bytes on the wire for rendered pages: a plain request, the same request
+# with gzip accepted, and a revalidation with the ETag from the first
+# response. Fails if a page is not compressed or does not answer 304.
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(repo_root, '1'))
+
+# (path, login as admin?)
+PAGES = [
+    ('/', False),
+    ('/club/clubs', False),
+    ('/club/club/1', False),
+    ('/event/event/1', False),
+    ('/admin/users', True),
+    ('/club/admin/requests', True),
+]
+
+
+def main():
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(tmp, "transfer.db")}'
+        from app import create_app
+        from app.schema import upgrade_schema
+        from app.seed import seed_data
+
+        app = create_app()
+        with app.app_context():
+            upgrade_schema()
+            seed_data()
+
+        anonymous, admin = app.test_client(), app.test_client()
+        admin.post('/auth/login', data={'username': 'admin', 'password': 'adminpass'})
+
+        print(f'{"page":<22} {"identity":>9} {"gzip":>7} {"304":>5}')
+        total_before = total_after = 0
+        for path, as_admin in PAGES:
+            client = admin if as_admin else anonymous
+            plain = client.get(path, headers={'Accept-Encoding': 'identity'})
+            zipped = client.get(path, headers={'Accept-Encoding': 'gzip'})
+            again = client.get(path, headers={'Accept-Encoding': 'gzip',
+                                              'If-None-Match': zipped.headers.get('ETag', '')})
+            print(f'{path:<22} {len(plain.data):>9} {len(zipped.data):>7} {len(again.data):>5}'
+                  f'  (status {again.status_code})')
+            total_before += 2 * len(plain.data)
+            total_after += len(zipped.data) + len(again.data)
+            if zipped.headers.get('Content-Encoding') != 'gzip' or again.status_code != 304:
+                failed = True
+
+    print(f'first visit + revisit: {total_before} bytes before, {total_after} bytes after '
+          f'({100 * (1 - total_after / total_before):.0f}% less)')
+    if failed:
+        print('FAIL: a page was not compressed or not revalidated')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
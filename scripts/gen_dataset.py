@@ -0,0 +1,152 @@
+import argparse
+import itertools
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+# Synthetic dataset for benchmarks: users, clubs, events, memberships and
+# attendance written straight into a SQLite file with batched inserts.
+# Membership and attendance follow a Zipf-like curve, so a handful of clubs
+# and events have tens of thousands of members while most have a few dozen,
+# which is what the real site looks like and what makes per-club queries
+# interesting. Every generated user logs in with BENCH_PASSWORD.
+#
+#   python scripts/gen_dataset.py /tmp/bench.db --users 100000 --clubs 5000
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(repo_root, '1'))
+
+BENCH_PASSWORD = 'benchpass'
+BATCH = 10000
+WORDS = ('müzik konser şiir dinletisi söyleşi atölye gezi turnuva satranç fotoğraf sergi '
+         'tiyatro gösteri kodlama yarışma robotik seminer panel doğa yürüyüşü kamp koşu '
+         'ışık gölge çizim resim dans halk oyunları kitap okuma buluşma tanışma').split()
+PLACES = ['Kampüs Merkezi', 'Spor Salonu', 'Konferans Salonu', 'Kütüphane', 'Amfi 1', 'Bahçe']
+
+
+def zipf_weights(n, skew=0.9):
+    return list(itertools.accumulate(1 / rank ** skew for rank in range(1, n + 1)))
+
+
+def sentence(rng, k):
+    return ' '.join(rng.choices(WORDS, k=k))
+
+
+def _insert(db, table, rows):
+    for start in range(0, len(rows), BATCH):
+        db.session.execute(table.insert(), rows[start:start + BATCH])
+
+
+def generate(db, users=10000, clubs=1000, events_per_club=10, memberships=5,
+             attendance=3, requests=200, seed=1, log=print):
+    # Appends to the database of the current app context; returns row counts
+    from app.models import User, Club, Event, ClubRequest, club_members, event_attendees
+    from app.passwords import hasher
+    from app.counters import recount_all
+    from app.search import reindex
+
+    rng = random.Random(seed)
+    start = time.perf_counter()
+
+    def done(what, count):
+        log(f'{what:<12} {count:>9}  ({time.perf_counter() - start:.1f}s)')
+
+    # One hash shared by every user; hashing a million passwords is not the point
+    password_hash = hasher.hash(BENCH_PASSWORD)
+    first_user = (db.session.query(db.func.max(User.id)).scalar() or 0) + 1
+    for offset in range(0, users, BATCH):
+        _insert(db, User.__table__, [
+            {'username': f'user{i}', 'email': f'user{i}@example.com',
+             'password_hash': password_hash, 'role': 'member'}
+            for i in range(offset, min(offset + BATCH, users))])
+    db.session.commit()
+    user_ids = range(first_user, first_user + users)
+    done('users', users)
+
+    first_club = (db.session.query(db.func.max(Club.id)).scalar() or 0) + 1
+    _insert(db, Club.__table__, [
+        {'name': f'Kulüp {i} {WORDS[i % len(WORDS)]}', 'description': sentence(rng, 12),
+         'president_id': rng.choice(user_ids)} for i in range(clubs)])
+    db.session.commit()
+    club_ids = list(range(first_club, first_club + clubs))
+    done('clubs', clubs)
+
+    now = datetime.now().replace(microsecond=0)
+    first_event = (db.session.query(db.func.max(Event.id)).scalar() or 0) + 1
+    event_count = clubs * events_per_club
+    _insert(db, Event.__table__, [
+        {'name': f'{sentence(rng, 2).capitalize()} {i}', 'description': sentence(rng, 20),
+         'date': now + timedelta(hours=rng.randint(-24 * 180, 24 * 180)),
+         'location': rng.choice(PLACES), 'club_id': club_ids[i % clubs]}
+        for i in range(event_count)])
+    db.session.commit()
+    event_ids = list(range(first_event, first_event + event_count))
+    done('events', event_count)
+
+    # Popularity is by id order: club_ids[0] / event_ids[0] are the biggest
+    club_weights = zipf_weights(clubs)
+    event_weights = zipf_weights(event_count)
+    counts = {'memberships': 0, 'attendance': 0}
+    for offset in range(0, users, BATCH // max(memberships, attendance, 1)):
+        member_rows, attendee_rows = [], []
+        for user_id in user_ids[offset:offset + BATCH // max(memberships, attendance, 1)]:
+            for club_id in set(rng.choices(club_ids, cum_weights=club_weights, k=rng.randint(0, 2 * memberships))):
+                member_rows.append({'user_id': user_id, 'club_id': club_id})
+            for event_id in set(rng.choices(event_ids, cum_weights=event_weights, k=rng.randint(0, 2 * attendance))):
+                attendee_rows.append({'user_id': user_id, 'event_id': event_id})
+        _insert(db, club_members, member_rows)
+        _insert(db, event_attendees, attendee_rows)
+        db.session.commit()
+        counts['memberships'] += len(member_rows)
+        counts['attendance'] += len(attendee_rows)
+    done('memberships', counts['memberships'])
+    done('attendance', counts['attendance'])
+    recount_all()
+    db.session.commit()
+    done('counters', clubs + event_count)
+
+    _insert(db, ClubRequest.__table__, [
+        {'user_id': rng.choice(user_ids), 'name': f'Yeni kulüp {i}', 'description': sentence(rng, 10),
+         'status': 'pending'} for i in range(requests)])
+    db.session.commit()
+    done('requests', requests)
+
+    reindex()
+    done('search index', clubs + event_count)
+    return {'users': users, 'clubs': clubs, 'events': event_count, 'requests': requests, **counts}
+
+
+def build(path, log=print, **sizes):
+    # Fresh database at path with the schema, the normal seed and the synthetic rows
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.abspath(path)}'
+    from app import create_app, db
+    from app.schema import upgrade_schema
+    from app.seed import seed_data
+
+    app = create_app()
+    with app.app_context():
+        upgrade_schema()
+        seed_data()
+        return generate(db, log=log, **sizes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic benchmark database.')
+    parser.add_argument('path', help='SQLite file to create')
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--clubs', type=int, default=1000)
+    parser.add_argument('--events-per-club', type=int, default=10)
+    parser.add_argument('--memberships', type=int, default=5, help='average clubs per user')
+    parser.add_argument('--attendance', type=int, default=3, help='average events per user')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    if os.path.exists(args.path):
+        parser.error(f'{args.path} already exists')
+    build(args.path, users=args.users, clubs=args.clubs, events_per_club=args.events_per_club,
+          memberships=args.memberships, attendance=args.attendance, seed=args.seed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+import argparse
+import http.client
+import statistics
+import threading
+import time
+from urllib.parse import urlsplit
+
+# Small closed-loop HTTP load generator: N client threads with keep-alive
+# connections request the given paths round-robin for a fixed duration.
+# A path written as POST:/auth/login?username=a&password=b sends the query
+# string as a form body instead.
+#
+#   python scripts/loadgen.py http://127.0.0.1:5000 / /club/clubs -c 32 -d 20
+
+
+def client(base, paths, deadline, latencies, errors, lock):
+    parts = urlsplit(base)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+    mine, failed, i = [], 0, 0
+    while time.monotonic() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            if path.startswith('POST:'):
+                target, _, body = path[5:].partition('?')
+                conn.request('POST', target, body=body,
+                             headers={'Content-Type': 'application/x-www-form-urlencoded'})
+            else:
+                conn.request('GET', path)
+            response = conn.getresponse()
+            response.read()
+            if response.status >= 500:
+                failed += 1
+            else:
+                mine.append(time.perf_counter() - start)
+        except (OSError, http.client.HTTPException):
+            failed += 1
+            conn.close()
+            conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+    conn.close()
+    with lock:
+        latencies.extend(mine)
+        errors.append(failed)
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run(base, paths, concurrency, duration):
+    latencies, errors, lock = [], [], threading.Lock()
+    deadline = time.monotonic() + duration
+    threads = [threading.Thread(target=client, args=(base, paths, deadline, latencies, errors, lock))
+               for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': sum(errors),
+        'rps': len(latencies) / duration,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'mean_ms': (statistics.mean(latencies) * 1000) if latencies else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('base', help='e.g. http://127.0.0.1:5000')
+    parser.add_argument('paths', nargs='+')
+    parser.add_argument('-c', '--concurrency', type=int, default=16)
+    parser.add_argument('-d', '--duration', type=float, default=10.0)
+    args = parser.parse_args()
+
+    result = run(args.base, args.paths, args.concurrency, args.duration)
+    print(f"{result['rps']:.1f} req/s  p50 {result['p50_ms']:.1f} ms  p95 {result['p95_ms']:.1f} ms  "
+          f"p99 {result['p99_ms']:.1f} ms  errors {result['errors']}")
+
+
+if __name__ == '__main__':
+    main()